@@ -1,12 +1,19 @@
+import concurrent.futures
 import csv
+import dataclasses
+import functools
 import io
+import itertools
 import json
 import logging
 import os
 import pathlib
+import random
 import re
+import shutil
 import sys
 import tempfile
+import threading
 import time
 import urllib.error
 import urllib.parse
@@ -16,6 +23,13 @@ import zipfile
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Matches the page number in the "last" relation link of a paginated API response's Link header. The match is confined
+# to a single <URL> by the character classes, so it can't span links and is not thrown off by commas in the query.
+last_page_link_pattern = re.compile(pattern=r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"', flags=re.IGNORECASE)
+
+# Translation table that removes the Markdown markup not needed in the CSV report (i.e., "code span")
+csv_markup_translation_table = str.maketrans("", "", "`")
+
 
 def main() -> None:
     set_verbosity(enable_verbosity=False)
@@ -66,6 +80,22 @@ class ReportSizeDeltas:
 
     report_key_beginning = "**Memory usage change @ "
     not_applicable_indicator = "N/A"
+    # Number of pull requests to process concurrently
+    maximum_pr_workers = 8
+    # Number of artifacts to download concurrently
+    maximum_download_workers = 8
+    # Number of pages of a paginated API response to request concurrently
+    maximum_page_workers = 4
+    # Number of workflow runs to check for artifacts concurrently
+    maximum_run_workers = 4
+    # Maximum number of HTTP requests being opened simultaneously, to avoid triggering GitHub's secondary rate limits.
+    # This only limits sending the request and receiving the response headers. Response bodies are read afterwards by
+    # the caller, so the number of concurrent transfers is bounded by the worker counts above rather than by this.
+    maximum_concurrent_requests = 6
+    # Seconds for which the result of a check of the API rate limit is trusted
+    rate_limit_check_interval = 30
+    # Remaining API request count below which the rate limit is checked before every request
+    rate_limit_remaining_threshold = 50
 
     class ReportKeys:
         """Key names used in the sketches report dictionary."""
@@ -90,6 +120,33 @@ class ReportSizeDeltas:
         self.repository_name = repository_name
         self.sketches_reports_source = sketches_reports_source
         self.token = token
+        self.request_semaphore = threading.Semaphore(value=self.maximum_concurrent_requests)
+        # Result of the last check of the API rate limit
+        self.rate_limit_lock = threading.Lock()
+        self.rate_limit_remaining: int | None = None
+        self.rate_limit_check_time: float = 0
+        self.rate_limit_check_in_progress = False
+
+    @functools.cached_property
+    def sketches_reports_source_pattern(self) -> re.Pattern:
+        """Compiled regular expression for the names of the workflow artifacts that contain the sketches reports.
+
+        This is only compiled on first use because sketches_reports_source is a path rather than a regular expression
+        when the action is run from a pull_request triggered workflow.
+        """
+        return re.compile(pattern=self.sketches_reports_source)
+
+    @functools.cached_property
+    def default_request_headers(self) -> dict[str, str]:
+        """Headers sent with every HTTP request. These don't change over the lifetime of the object, so the dictionary
+        is only built once.
+        """
+        return {
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {self.token}",
+            "User-Agent": self.repository_name.split("/")[0],
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
 
     def report_size_deltas(self) -> None:
         """Comment a report of memory usage change to pull request(s)."""
@@ -118,54 +175,69 @@ class ReportSizeDeltas:
         """Scan the repository's pull requests and comment memory usage change reports where appropriate."""
         # Get the repository's pull requests
         logger.debug("Getting PRs for " + self.repository_name)
-        page_number = 1
-        page_count = 1
-        while page_number <= page_count:
-            api_data = self.api_request(request="repos/" + self.repository_name + "/pulls", page_number=page_number)
-            prs_data = api_data["json_data"]
-            for pr_data in prs_data:
-                # Note: closed PRs are not listed in the API response
-                pr_number = pr_data["number"]
-                pr_head_sha = pr_data["head"]["sha"]
-                print("::debug::Processing pull request number:", pr_number)
-                # When a PR is locked, only collaborators may comment. The automatically generated GITHUB_TOKEN owned by
-                # the github-actions bot will likely be used. The bot doesn't have collaborator status so it will
-                # generally be impossible to make reports on locked PRs.
-                if pr_data["locked"]:
-                    print("::debug::PR locked, skipping")
-                    continue
+        # Each PR is processed in a worker thread. The comments are submitted from the main thread.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.maximum_pr_workers) as executor:
+            try:
+                pr_report_futures = {}
+                for prs_data in self.api_request_pages(request=f"repos/{self.repository_name}/pulls"):
+                    for pr_data in prs_data:
+                        # Note: closed PRs are not listed in the API response
+                        pr_report_futures[executor.submit(self.get_pr_report, pr_data=pr_data)] = pr_data["number"]
+
+                for pr_report_future in concurrent.futures.as_completed(pr_report_futures):
+                    report = pr_report_future.result()
+                    if report is not None:
+                        self.comment_report(pr_number=pr_report_futures[pr_report_future], report_markdown=report)
+            except BaseException:
+                # Don't continue processing the remaining PRs after a failure (or exit due to rate limiting)
+                executor.shutdown(cancel_futures=True)
+                raise
 
-                if self.report_exists(pr_number=pr_number, pr_head_sha=pr_head_sha):
-                    # Go on to the next PR
-                    print("::debug::Report already exists")
-                    continue
+    def get_pr_report(self, pr_data):
+        """Return the Markdown for the memory usage change report of the pull request, or None if no report should be
+        commented.
 
-                artifacts_data = self.get_artifacts_data_for_sha(
-                    pr_user_login=pr_data["user"]["login"], pr_head_ref=pr_data["head"]["ref"], pr_head_sha=pr_head_sha
-                )
-                if artifacts_data is None:
-                    # Go on to the next PR
-                    print("::debug::No sketches report artifact found")
-                    continue
+        Keyword arguments:
+        pr_data -- data object for the pull request, as returned by the GitHub API
+        """
+        pr_number = pr_data["number"]
+        pr_head_sha = pr_data["head"]["sha"]
+        print("::debug::Processing pull request number:", pr_number)
+        # When a PR is locked, only collaborators may comment. The automatically generated GITHUB_TOKEN owned by
+        # the github-actions bot will likely be used. The bot doesn't have collaborator status so it will
+        # generally be impossible to make reports on locked PRs.
+        if pr_data["locked"]:
+            print("::debug::PR locked, skipping")
+            return None
 
-                artifact_folder_object = self.get_artifacts(artifacts_data=artifacts_data)
+        if self.report_exists(pr_number=pr_number, pr_head_sha=pr_head_sha):
+            # Go on to the next PR
+            print("::debug::Report already exists")
+            return None
 
-                sketches_reports = self.get_sketches_reports(artifacts_folder_object=artifact_folder_object)
+        artifacts_data = self.get_artifacts_data_for_sha(
+            pr_user_login=pr_data["user"]["login"], pr_head_ref=pr_data["head"]["ref"], pr_head_sha=pr_head_sha
+        )
+        if artifacts_data is None:
+            # Go on to the next PR
+            print("::debug::No sketches report artifact found")
+            return None
 
-                if sketches_reports:
-                    if sketches_reports[0][self.ReportKeys.commit_hash] != pr_head_sha:
-                        # The deltas report key uses the hash from the report, but the report_exists() comparison is
-                        # done using the hash provided by the API. If for some reason the two didn't match, it would
-                        # result in the deltas report being done over and over again.
-                        print("::warning::Report commit hash doesn't match PR's head commit hash, skipping")
-                        continue
+        artifact_folder_object = self.get_artifacts(artifacts_data=artifacts_data)
 
-                    report = self.generate_report(sketches_reports=sketches_reports)
+        sketches_reports = self.get_sketches_reports(artifacts_folder_object=artifact_folder_object)
+
+        if not sketches_reports:
+            return None
 
-                    self.comment_report(pr_number=pr_number, report_markdown=report)
+        if sketches_reports[0][self.ReportKeys.commit_hash] != pr_head_sha:
+            # The deltas report key uses the hash from the report, but the report_exists() comparison is
+            # done using the hash provided by the API. If for some reason the two didn't match, it would
+            # result in the deltas report being done over and over again.
+            print("::warning::Report commit hash doesn't match PR's head commit hash, skipping")
+            return None
 
-            page_number += 1
-            page_count = api_data["page_count"]
+        return self.generate_report(sketches_reports=sketches_reports)
 
     def report_exists(self, pr_number: int, pr_head_sha: str) -> bool:
         """Return whether a report has already been commented to the pull request thread for the latest workflow run.
@@ -174,24 +246,19 @@ class ReportSizeDeltas:
         pr_number -- number of the pull request to check
         pr_head_sha -- PR's head branch hash
         """
-        # Get the pull request's comments
-        page_number = 1
-        page_count = 1
-        while page_number <= page_count:
-            api_data = self.api_request(
-                request="repos/" + self.repository_name + "/issues/" + str(pr_number) + "/comments",
-                page_number=page_number,
-            )
+        report_key = self.report_key_beginning + pr_head_sha
 
-            comments_data = api_data["json_data"]
-            for comment_data in comments_data:
+        # Get the pull request's comments
+        # The report for the PR's head SHA is most likely one of the newest comments, so search from newest to oldest
+        for comments_data in self.api_request_pages(
+            request=f"repos/{self.repository_name}/issues/{pr_number}/comments", reverse=True
+        ):
+            for comment_data in reversed(comments_data):
                 # Check if the comment is a report for the PR's head SHA
-                if comment_data["body"].startswith(self.report_key_beginning + pr_head_sha):
+                if comment_data["body"].startswith(report_key):
+                    # The requests for the remaining pages are canceled when the generator is closed
                     return True
 
-            page_number += 1
-            page_count = api_data["page_count"]
-
         # No reports found for the PR's head SHA
         return False
 
@@ -203,31 +270,38 @@ class ReportSizeDeltas:
         pr_head_ref -- name of the PR head branch (used to reduce number of GitHub API requests)
         pr_head_sha -- hash of the head commit in the PR branch
         """
-        # Get the repository's workflow runs
-        page_number = 1
-        page_count = 1
-        while page_number <= page_count:
-            api_data = self.api_request(
-                request="repos/" + self.repository_name + "/actions/runs",
-                request_parameters="actor="
-                + pr_user_login
-                + "&branch="
-                + pr_head_ref
-                + "&event=pull_request&status=completed",
-                page_number=page_number,
-            )
-            runs_data = api_data["json_data"]
+        # IDs of the runs of the PR's head SHA, in order (dictionary keys are used to avoid duplicates)
+        run_ids: dict[int, None] = {}
 
-            # Find the runs with the head SHA of the PR (there may be multiple runs)
+        # Get the repository's workflow runs
+        for runs_data in self.api_request_pages(
+            request=f"repos/{self.repository_name}/actions/runs",
+            request_parameters={
+                "actor": pr_user_login,
+                "branch": pr_head_ref,
+                "event": "pull_request",
+                "status": "completed",
+                "head_sha": pr_head_sha,
+            },
+        ):
+            # Find the runs with the head SHA of the PR (there may be multiple runs). The API request already filters
+            # by head SHA, so this is only a safeguard.
             for run_data in runs_data["workflow_runs"]:
                 if run_data["head_sha"] == pr_head_sha:
-                    # Check if this run has the artifacts we're looking for
-                    artifacts_data = self.get_artifacts_data_for_run(run_id=run_data["id"])
-                    if artifacts_data is not None:
-                        return artifacts_data
+                    run_ids[run_data["id"]] = None
 
-            page_number += 1
-            page_count = api_data["page_count"]
+        if not run_ids:
+            return None
+
+        # Check which of the runs has the artifacts we're looking for, checking the runs concurrently
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.maximum_run_workers)
+        try:
+            for artifacts_data in executor.map(lambda run_id: self.get_artifacts_data_for_run(run_id=run_id), run_ids):
+                if artifacts_data is not None:
+                    return artifacts_data
+        finally:
+            # The checks of the remaining runs are not needed once a match has been found
+            executor.shutdown(wait=False, cancel_futures=True)
 
         # No matching artifact found
         return None
@@ -241,26 +315,17 @@ class ReportSizeDeltas:
         report_artifacts_data = []
 
         # Get the workflow run's artifacts
-        page_number = 1
-        page_count = 1
-        while page_number <= page_count:
-            api_data = self.api_request(
-                request="repos/" + self.repository_name + "/actions/runs/" + str(run_id) + "/artifacts",
-                page_number=page_number,
-            )
-            artifacts_data = api_data["json_data"]
-
+        for artifacts_data in self.api_request_pages(
+            request=f"repos/{self.repository_name}/actions/runs/{run_id}/artifacts"
+        ):
             for artifact_data in artifacts_data["artifacts"]:
                 # The artifacts are identified by name matching a pattern
-                if not artifact_data["expired"] and re.match(
-                    pattern=self.sketches_reports_source, string=artifact_data["name"]
+                if not artifact_data["expired"] and self.sketches_reports_source_pattern.match(
+                    string=artifact_data["name"]
                 ):
                     print("::debug::Found report artifact:", artifact_data["name"])
                     report_artifacts_data.append(artifact_data)
 
-            page_number += 1
-            page_count = api_data["page_count"]
-
         if len(report_artifacts_data) > 0:
             return report_artifacts_data
         else:
@@ -271,33 +336,60 @@ class ReportSizeDeltas:
         """Download and unzip the artifacts and return an object for the temporary directory containing them.
 
         Keyword arguments:
-        artifact_data -- data object for the artifact
+        artifacts_data -- list of data objects for the artifacts
         """
         # Create temporary folder
         artifacts_folder_object = tempfile.TemporaryDirectory(prefix="reportsizedeltas-")
         artifacts_folder_path = pathlib.Path(artifacts_folder_object.name)
-        for artifact_data in artifacts_data:
-            try:
-                print("::debug::Downloading artifact:", artifact_data["name"])
-                artifact_folder_path = artifacts_folder_path.joinpath(artifact_data["name"])
-                artifact_folder_path.mkdir()
-                artifact_zip_file_path = artifact_folder_path.joinpath(artifact_data["name"] + ".zip")
-                # Download artifact
-                with artifact_zip_file_path.open(mode="wb") as out_file:
-                    with self.raw_http_request(url=artifact_data["archive_download_url"]) as fp:
-                        out_file.write(fp.read())
-
-                # Unzip artifact
-                with zipfile.ZipFile(file=artifact_zip_file_path, mode="r") as zip_ref:
-                    zip_ref.extractall(path=artifact_folder_path)
-                artifact_zip_file_path.unlink()
-
-            except Exception:
-                artifacts_folder_object.cleanup()
-                raise
+        try:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, min(self.maximum_download_workers, len(artifacts_data)))
+            ) as executor:
+                download_futures = [
+                    executor.submit(
+                        self.download_artifact, artifact_data=artifact_data, artifacts_folder_path=artifacts_folder_path
+                    )
+                    for artifact_data in artifacts_data
+                ]
+                done_futures, pending_futures = concurrent.futures.wait(
+                    download_futures, return_when=concurrent.futures.FIRST_EXCEPTION
+                )
+                for pending_future in pending_futures:
+                    pending_future.cancel()
+                for done_future in done_futures:
+                    # Pass on any exception that occurred during the download
+                    done_future.result()
+
+        except Exception:
+            artifacts_folder_object.cleanup()
+            raise
 
         return artifacts_folder_object
 
+    def download_artifact(self, artifact_data, artifacts_folder_path) -> None:
+        """Download and unzip the artifact to a subfolder of the given folder.
+
+        Keyword arguments:
+        artifact_data -- data object for the artifact
+        artifacts_folder_path -- path of the folder to put the artifact's subfolder in
+        """
+        # Size of the chunks the download is written to the buffer in
+        download_chunk_size = 1 << 20
+        # Archives up to this size are buffered in memory rather than written to disk
+        maximum_in_memory_archive_size = 64 << 20
+
+        print("::debug::Downloading artifact:", artifact_data["name"])
+        artifact_folder_path = artifacts_folder_path.joinpath(artifact_data["name"])
+        artifact_folder_path.mkdir()
+        with tempfile.SpooledTemporaryFile(max_size=maximum_in_memory_archive_size) as archive_file:
+            # Download artifact
+            with self.raw_http_request(url=artifact_data["archive_download_url"]) as fp:
+                shutil.copyfileobj(fsrc=fp, fdst=archive_file, length=download_chunk_size)
+
+            # Unzip artifact
+            with zipfile.ZipFile(file=archive_file, mode="r") as zip_ref:
+                zip_ref.extractall(path=artifact_folder_path)
+
     def get_sketches_reports(self, artifacts_folder_object):
         """Parse the artifact files and return a list containing the data.
 
@@ -305,34 +397,31 @@ class ReportSizeDeltas:
         artifacts_folder_object -- object containing the data about the temporary folder that stores the Markdown files
         """
         with artifacts_folder_object as artifacts_folder:
-            # artifact_folder will be a string when running in non-local report mode
-            artifacts_folder = pathlib.Path(artifacts_folder)
-            sketches_reports = []
-            for report_filename in sorted(artifacts_folder.rglob(pattern="*.json")):
-                if report_filename.is_dir():
-                    # pathlib.Path.rglob returns matching folders in addition to files
-                    continue
+            report_file_paths = []
+            # os.walk() lists the files and subfolders separately, so folders with names ending in .json are excluded
+            for folder_path, _, file_names in os.walk(top=artifacts_folder):
+                for file_name in file_names:
+                    if file_name.endswith(".json"):
+                        report_file_paths.append(os.path.join(folder_path, file_name))
 
+            sketches_reports = []
+            # Sort by path component, the same as sorting pathlib.Path objects
+            for report_file_path in sorted(report_file_paths, key=lambda path: path.split(os.sep)):
                 # Combine sketches reports into an array
-                with open(file=report_filename) as report_file:
+                # json.load() detects the encoding of binary data, so the file doesn't need to be decoded separately
+                with open(file=report_file_path, mode="rb") as report_file:
                     report_data = json.load(report_file)
-                    if (
-                        (self.ReportKeys.boards not in report_data)
-                        or (self.ReportKeys.sizes not in report_data[self.ReportKeys.boards][0])
-                        or (
-                            self.ReportKeys.maximum
-                            not in report_data[self.ReportKeys.boards][0][self.ReportKeys.sizes][0]
-                        )
-                    ):
-                        # Sketches reports use an old format, skip
-                        print("Old format sketches report found, skipping")
-                        continue
+                if (
+                    (self.ReportKeys.boards not in report_data)
+                    or (self.ReportKeys.sizes not in report_data[self.ReportKeys.boards][0])
+                    or (self.ReportKeys.maximum not in report_data[self.ReportKeys.boards][0][self.ReportKeys.sizes][0])
+                ):
+                    # Sketches reports use an old format, skip
+                    print("Old format sketches report found, skipping")
+                    continue
 
-                    for fqbn_data in report_data[self.ReportKeys.boards]:
-                        if self.ReportKeys.sizes in fqbn_data:
-                            # The report contains deltas data
-                            sketches_reports.append(report_data)
-                            break
+                # The format check above established that the report contains deltas data
+                sketches_reports.append(report_data)
 
         if not sketches_reports:
             print(
@@ -355,46 +444,43 @@ class ReportSizeDeltas:
 
         fqbn_column_heading = "Board"
 
-        # Generate summary report data
-        summary_report_data = [[fqbn_column_heading]]
+        # Generate summary and detailed report data in a single pass over the sketches reports
+        summary_report_data = create_report_data(first_column_heading=fqbn_column_heading)
+        full_report_data = create_report_data(first_column_heading=fqbn_column_heading)
         for fqbns_data in sketches_reports:
             for fqbn_data in fqbns_data[self.ReportKeys.boards]:
                 self.add_summary_report_row(summary_report_data, fqbn_data)
-
-        # Generate detailed report data
-        full_report_data = [[fqbn_column_heading]]
-        for fqbns_data in sketches_reports:
-            for fqbn_data in fqbns_data[self.ReportKeys.boards]:
                 self.add_detailed_report_row(full_report_data, fqbn_data)
 
+        report = LengthLimitedWriter(maximum_length=maximum_report_length)
+
         # Add comment heading
-        report_markdown = self.report_key_beginning + sketches_reports[0][self.ReportKeys.commit_hash] + "**\n\n"
+        report.write(text=self.report_key_beginning + sketches_reports[0][self.ReportKeys.commit_hash] + "**\n\n")
 
         # Add summary table
-        report_markdown = report_markdown + generate_markdown_table(row_list=summary_report_data) + "\n"
-
-        # Add full table
-        report_markdown_with_table = (
-            report_markdown + "<details>\n" "<summary>Click for full report table</summary>\n\n"
-        )
-        report_markdown_with_table = (
-            report_markdown_with_table + generate_markdown_table(row_list=full_report_data) + "\n</details>\n\n"
-        )
-
-        if len(report_markdown_with_table) < maximum_report_length:
-            report_markdown = report_markdown_with_table
-
-            # Add full CSV
-            report_markdown_with_csv = (
-                report_markdown + "<details>\n" "<summary>Click for full report CSV</summary>\n\n" "```\n"
+        report.write(text=generate_markdown_table(row_list=get_report_row_list(report_data=summary_report_data)))
+        report.write(text="\n")
+
+        full_report_row_list = get_report_row_list(report_data=full_report_data)
+
+        # Add full table, then full CSV, as long as they fit in the comment
+        # The tables are formatted line by line as they are written, so formatting stops once the limit is reached
+        if report.write_within_limit(
+            chunks=itertools.chain(
+                ["<details>\n<summary>Click for full report table</summary>\n\n"],
+                iter_markdown_table(row_list=full_report_row_list),
+                ["\n</details>\n\n"],
             )
-            report_markdown_with_csv = (
-                report_markdown_with_csv + generate_csv_table(row_list=full_report_data) + "```\n</details>"
+        ):
+            report.write_within_limit(
+                chunks=itertools.chain(
+                    ["<details>\n<summary>Click for full report CSV</summary>\n\n```\n"],
+                    iter_csv_rows(row_list=full_report_row_list),
+                    ["```\n</details>"],
+                )
             )
 
-            if len(report_markdown_with_csv) < maximum_report_length:
-                report_markdown = report_markdown_with_csv
-
+        report_markdown = report.getvalue()
         logger.debug("Report:\n" + report_markdown)
         return report_markdown
 
@@ -405,41 +491,45 @@ class ReportSizeDeltas:
         report_data -- the report to add the row to
         right_directory -- the data used to populate the row
         """
-        row_number = len(report_data)
+        # Look these up once rather than for every cell
+        report_keys = self.ReportKeys
+        not_applicable_indicator = self.not_applicable_indicator
+
         # Add a row to the report
-        row = ["" for _ in range(len(report_data[0]))]
-        row[0] = f"`{fqbn_data[self.ReportKeys.board]}`"
-        report_data.append(row)
+        row = {0: f"`{fqbn_data[report_keys.board]}`"}
+        report_data.rows.append(row)
 
         # Populate the row with data
-        for size_data in fqbn_data[self.ReportKeys.sizes]:
+        for size_data in fqbn_data[report_keys.sizes]:
             # Determine column number for this memory type
-            column_number = get_report_column_number(report=report_data, column_heading=size_data[self.ReportKeys.name])
+            column_number = get_report_column_number(report=report_data, column_heading=size_data[report_keys.name])
 
             # Add the memory data to the cell
-            if self.ReportKeys.delta in size_data:
+            if report_keys.delta in size_data:
                 # Absolute data
-                report_data[row_number][column_number] = self.get_summary_value(
+                absolute_delta_data = size_data[report_keys.delta][report_keys.absolute]
+                row[column_number] = self.get_summary_value(
                     show_emoji=True,
-                    minimum=size_data[self.ReportKeys.delta][self.ReportKeys.absolute][self.ReportKeys.minimum],
-                    maximum=size_data[self.ReportKeys.delta][self.ReportKeys.absolute][self.ReportKeys.maximum],
+                    minimum=absolute_delta_data[report_keys.minimum],
+                    maximum=absolute_delta_data[report_keys.maximum],
                 )
 
                 # Relative data
-                report_data[row_number][column_number + 1] = self.get_summary_value(
+                relative_delta_data = size_data[report_keys.delta][report_keys.relative]
+                row[column_number + 1] = self.get_summary_value(
                     show_emoji=False,
-                    minimum=size_data[self.ReportKeys.delta][self.ReportKeys.relative][self.ReportKeys.minimum],
-                    maximum=size_data[self.ReportKeys.delta][self.ReportKeys.relative][self.ReportKeys.maximum],
+                    minimum=relative_delta_data[report_keys.minimum],
+                    maximum=relative_delta_data[report_keys.maximum],
                 )
             else:
                 # Absolute data
-                report_data[row_number][column_number] = self.get_summary_value(
-                    show_emoji=True, minimum=self.not_applicable_indicator, maximum=self.not_applicable_indicator
+                row[column_number] = self.get_summary_value(
+                    show_emoji=True, minimum=not_applicable_indicator, maximum=not_applicable_indicator
                 )
 
                 # Relative data
-                report_data[row_number][column_number + 1] = self.get_summary_value(
-                    show_emoji=False, minimum=self.not_applicable_indicator, maximum=self.not_applicable_indicator
+                row[column_number + 1] = self.get_summary_value(
+                    show_emoji=False, minimum=not_applicable_indicator, maximum=not_applicable_indicator
                 )
 
     def add_detailed_report_row(self, report_data, fqbn_data) -> None:
@@ -449,40 +539,42 @@ class ReportSizeDeltas:
         report_data -- the report to add the row to
         right_directory -- the data used to populate the row
         """
-        row_number = len(report_data)
+        # Look these up once rather than for every cell
+        report_keys = self.ReportKeys
+        not_applicable_indicator = self.not_applicable_indicator
+
         # Add a row to the report
-        row = ["" for _ in range(len(report_data[0]))]
-        row[0] = f"`{fqbn_data[self.ReportKeys.board]}`"
-        report_data.append(row)
+        row = {0: f"`{fqbn_data[report_keys.board]}`"}
+        report_data.rows.append(row)
 
         # Populate the row with data
-        for sketch in fqbn_data[self.ReportKeys.sketches]:
-            for size_data in sketch[self.ReportKeys.sizes]:
+        for sketch in fqbn_data[report_keys.sketches]:
+            sketch_name = sketch[report_keys.name]
+            for size_data in sketch[report_keys.sizes]:
                 # Determine column number for this memory type
                 column_number = get_report_column_number(
                     report=report_data,
                     column_heading=(
                         "`{sketch_name}`<br>{size_name}".format(
-                            sketch_name=sketch[self.ReportKeys.name], size_name=size_data[self.ReportKeys.name]
+                            sketch_name=sketch_name, size_name=size_data[report_keys.name]
                         )
                     ),
                 )
 
                 # Add the memory data to the cell
-                if self.ReportKeys.delta in size_data:
+                if report_keys.delta in size_data:
+                    delta_data = size_data[report_keys.delta]
                     # Absolute
-                    report_data[row_number][column_number] = size_data[self.ReportKeys.delta][self.ReportKeys.absolute]
+                    row[column_number] = delta_data[report_keys.absolute]
 
                     # Relative
-                    report_data[row_number][column_number + 1] = size_data[self.ReportKeys.delta][
-                        self.ReportKeys.relative
-                    ]
+                    row[column_number + 1] = delta_data[report_keys.relative]
                 else:
                     # Absolute
-                    report_data[row_number][column_number] = self.not_applicable_indicator
+                    row[column_number] = not_applicable_indicator
 
                     # Relative
-                    report_data[row_number][column_number + 1] = self.not_applicable_indicator
+                    row[column_number + 1] = not_applicable_indicator
 
     def get_summary_value(self, show_emoji: bool, minimum, maximum) -> str:
         """Return the Markdown formatted text for a memory change data cell in the report table.
@@ -531,12 +623,13 @@ class ReportSizeDeltas:
         report_markdown -- Markdown formatted report
         """
         print("::debug::Adding deltas report comment to pull request")
-        report_data = json.dumps(obj={"body": report_markdown}).encode(encoding="utf-8")
-        url = "https://api.github.com/repos/" + self.repository_name + "/issues/" + str(pr_number) + "/comments"
+        # The body is sent as UTF-8, so non-ASCII characters don't need to be escaped
+        report_data = json.dumps(obj={"body": report_markdown}, ensure_ascii=False).encode(encoding="utf-8")
+        url = f"https://api.github.com/repos/{self.repository_name}/issues/{pr_number}/comments"
 
         self.http_request(url=url, data=report_data)
 
-    def api_request(self, request: str, request_parameters: str = "", page_number: int = 1):
+    def api_request(self, request: str, request_parameters: dict[str, str] | None = None, page_number: int = 1):
         """Do a GitHub API request. Return a dictionary containing:
         json_data -- JSON object containing the response
         additional_pages -- indicates whether more pages of results remain (True, False)
@@ -544,20 +637,55 @@ class ReportSizeDeltas:
 
         Keyword arguments:
         request -- the section of the URL following https://api.github.com/
-        request_parameters -- GitHub API request parameters (see: https://developer.github.com/v3/#parameters)
-                              (default value: "")
+        request_parameters -- dictionary of GitHub API request parameters
+                              (see: https://developer.github.com/v3/#parameters)
+                              (default value: None)
         page_number -- Some responses will be paginated. This argument specifies which page should be returned.
                        (default value: 1)
         """
-        return self.get_json_response(
-            url="https://api.github.com/"
-            + request
-            + "?"
-            + request_parameters
-            + "&page="
-            + str(page_number)
-            + "&per_page=100"
-        )
+        query = urllib.parse.urlencode(query={**(request_parameters or {}), "page": page_number, "per_page": 100})
+        return self.get_json_response(url=f"https://api.github.com/{request}?{query}")
+
+    def api_request_pages(self, request: str, request_parameters: dict[str, str] | None = None, reverse: bool = False):
+        """Do a paginated GitHub API request. Return a generator that yields the JSON object of each page of the
+        response, in order. Once the first page has been loaded, the remaining pages are requested concurrently.
+
+        Keyword arguments:
+        request -- the section of the URL following https://api.github.com/
+        request_parameters -- dictionary of GitHub API request parameters
+                              (see: https://developer.github.com/v3/#parameters)
+                              (default value: None)
+        reverse -- yield the pages in order from last to first
+                   (default value: False)
+        """
+        api_data = self.api_request(request=request, request_parameters=request_parameters, page_number=1)
+        remaining_page_numbers = range(2, api_data["page_count"] + 1)
+        if reverse:
+            remaining_page_numbers = remaining_page_numbers[::-1]
+        else:
+            yield api_data["json_data"]
+
+        if api_data["page_count"] > 1:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.maximum_page_workers)
+            try:
+                page_futures = [
+                    executor.submit(
+                        self.api_request,
+                        request=request,
+                        request_parameters=request_parameters,
+                        page_number=page_number,
+                    )
+                    for page_number in remaining_page_numbers
+                ]
+                for page_future in page_futures:
+                    yield page_future.result()["json_data"]
+            finally:
+                # The caller might stop iterating before reaching the last page, in which case the requests for the
+                # remaining pages are not needed
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        if reverse:
+            yield api_data["json_data"]
 
     def get_json_response(self, url: str):
         """Load the specified URL and return a dictionary:
@@ -570,13 +698,18 @@ class ReportSizeDeltas:
         """
         try:
             response_data = self.http_request(url=url)
-            try:
-                json_data = json.loads(response_data["body"])
-            except json.decoder.JSONDecodeError as exception:
-                # Output some information on the exception
-                logger.warning(str(exception.__class__.__name__) + ": " + str(exception))
-                # Pass the exception on to the caller
-                raise exception
+
+            if response_data["body"] == b"[]":
+                # Empty lists are common (e.g. comments API request for a PR without comments), so skip the decoder
+                json_data = []
+            else:
+                try:
+                    json_data = json.loads(response_data["body"])
+                except json.decoder.JSONDecodeError as exception:
+                    # Output some information on the exception
+                    logger.warning(str(exception.__class__.__name__) + ": " + str(exception))
+                    # Pass the exception on to the caller
+                    raise exception
 
             if not json_data:
                 # There was no HTTP error but an empty list was returned (e.g. pulls API request when the repo
@@ -585,79 +718,132 @@ class ReportSizeDeltas:
                 additional_pages = False
             else:
                 page_count = get_page_count(link_header=response_data["headers"]["Link"])
-                if page_count > 1:
-                    additional_pages = True
-                else:
-                    additional_pages = False
+                additional_pages = page_count > 1
 
             return {"json_data": json_data, "additional_pages": additional_pages, "page_count": page_count}
         except Exception as exception:
             raise exception
 
-    def http_request(self, url: str, data: bytes | None = None):
+    def http_request(self, url: str, data: bytes | None = None, headers: dict[str, str] | None = None):
         """Make a request and return a dictionary:
-        read -- the response
-        info -- headers
+        body -- the raw response body (bytes)
+        headers -- headers
         url -- the URL of the resource retrieved
 
         Keyword arguments:
         url -- the URL to load
         data -- data to pass with the request
                 (default value: None)
+        headers -- additional headers to send with the request
+                   (default value: None)
         """
-        with self.raw_http_request(url=url, data=data) as response_object:
+        with self.raw_http_request(url=url, data=data, headers=headers) as response_object:
             return {
-                "body": response_object.read().decode(encoding="utf-8", errors="ignore"),
+                "body": response_object.read(),
                 "headers": response_object.info(),
                 "url": response_object.geturl(),
             }
 
-    def raw_http_request(self, url: str, data: bytes | None = None):
+    def raw_http_request(self, url: str, data: bytes | None = None, headers: dict[str, str] | None = None):
         """Make a request and return an object containing the response.
 
         Keyword arguments:
         url -- the URL to load
         data -- data to pass with the request
                 (default value: None)
+        headers -- additional headers to send with the request
+                   (default value: None)
         """
         # Maximum times to retry opening the URL before giving up
         maximum_urlopen_retries = 3
+        # Seconds to wait for the server to respond before giving up on the attempt
+        urlopen_timeout = 30
 
         logger.info("Opening URL: " + url)
 
         request = urllib.request.Request(url=url, data=data)
-        request.add_unredirected_header(key="Accept", val="application/vnd.github+json")
-        request.add_unredirected_header(key="Authorization", val="Bearer " + self.token)
-        request.add_unredirected_header(key="User-Agent", val=self.repository_name.split("/")[0])
-        request.add_unredirected_header(key="X-GitHub-Api-Version", val="2022-11-28")
+        # The headers are not passed to Request(), since those would also be sent to the host of a redirect (e.g., the
+        # storage server an artifact download redirects to), leaking the token
+        request_headers = {**self.default_request_headers, **(headers or {})}
+        for key, val in request_headers.items():
+            request.add_unredirected_header(key=key, val=val)
+
+        # The rate limit API is not subject to rate limiting
+        rate_limited = url.startswith("https://api.github.com") and not url.startswith(
+            "https://api.github.com/rate_limit"
+        )
 
         retry_count = 0
         while True:
             try:
-                # The rate limit API is not subject to rate limiting
-                if url.startswith("https://api.github.com") and not url.startswith("https://api.github.com/rate_limit"):
+                if rate_limited:
                     self.handle_rate_limiting()
-                return urllib.request.urlopen(url=request)
-            except urllib.error.HTTPError as exception:
-                if determine_urlopen_retry(exception=exception):
-                    if retry_count < maximum_urlopen_retries:
-                        retry_count += 1
-                        continue
-                    else:
-                        # Maximum retries reached without successfully opening URL
-                        print("Maximum number of URL load retries exceeded")
+                with self.request_semaphore:
+                    response = urllib.request.urlopen(url=request, timeout=urlopen_timeout)
+                if rate_limited:
+                    self.record_rate_limit_remaining(response_headers=response.headers)
+                return response
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as exception:
+                # The retry budget is checked first, since determine_urlopen_retry() waits before returning
+                if retry_count >= maximum_urlopen_retries:
+                    # Maximum retries reached without successfully opening URL
+                    print("Maximum number of URL load retries exceeded")
+                elif determine_urlopen_retry(exception=exception, retry_count=retry_count):
+                    retry_count += 1
+                    continue
 
                 print(f"::error::{exception.__class__.__name__}: {exception}")
-                for line in exception.fp:
-                    print(line.decode(encoding="utf-8", errors="ignore"))
+                print_http_error_body(exception=exception)
 
                 raise exception
 
+    def record_rate_limit_remaining(self, response_headers) -> None:
+        """Update the last known remaining API request count from the headers of an API response, so the rate limit
+        doesn't have to be checked via the rate limit API while plenty of requests remain.
+
+        Keyword arguments:
+        response_headers -- headers of the API response
+        """
+        remaining = response_headers.get("X-RateLimit-Remaining")
+        if remaining is not None:
+            with self.rate_limit_lock:
+                self.rate_limit_remaining = int(remaining)
+                self.rate_limit_check_time = time.monotonic()
+
     def handle_rate_limiting(self) -> None:
         """Check whether the GitHub API request limit has been reached.
         If so, exit with exit status 0.
         """
-        rate_limiting_data = self.get_json_response(url="https://api.github.com/rate_limit")["json_data"]
+        with self.rate_limit_lock:
+            if (
+                self.rate_limit_remaining is not None
+                and self.rate_limit_remaining > self.rate_limit_remaining_threshold
+                and time.monotonic() - self.rate_limit_check_time < self.rate_limit_check_interval
+            ):
+                # The request allotment was checked recently and is far from being used up, so skip the check and
+                # count this request against the last known value
+                self.rate_limit_remaining -= 1
+                return
+
+            if (
+                self.rate_limit_check_in_progress
+                and self.rate_limit_remaining is not None
+                and self.rate_limit_remaining > 0
+            ):
+                # Another thread is already checking. Count this request against the last known value rather than
+                # waiting for the check to finish.
+                self.rate_limit_remaining -= 1
+                return
+
+            self.rate_limit_check_in_progress = True
+
+        # The lock is not held during the request, so that the other threads are not blocked while it is made
+        try:
+            rate_limiting_data = self.get_json_response(url="https://api.github.com/rate_limit")["json_data"]
+        finally:
+            with self.rate_limit_lock:
+                self.rate_limit_check_in_progress = False
+
         # GitHub has two API types, each with their own request limits and counters.
         # "search" applies only to api.github.com/search.
         # "core" applies to all other parts of the API.
@@ -665,6 +851,9 @@ class ReportSizeDeltas:
         logger.debug("GitHub core API request allotment: " + str(rate_limiting_data["resources"]["core"]["limit"]))
         logger.debug("Remaining API requests: " + str(rate_limiting_data["resources"]["core"]["remaining"]))
         logger.debug("API request count reset time: " + str(rate_limiting_data["resources"]["core"]["reset"]))
+        with self.rate_limit_lock:
+            self.rate_limit_remaining = rate_limiting_data["resources"]["core"]["remaining"]
+            self.rate_limit_check_time = time.monotonic()
 
         if rate_limiting_data["resources"]["core"]["remaining"] == 0:
             # GitHub uses a fixed rate limit window of 60 minutes. The window starts when the API request count goes
@@ -673,54 +862,155 @@ class ReportSizeDeltas:
             sys.exit(0)
 
 
-def determine_urlopen_retry(exception: urllib.error.HTTPError) -> bool:
+class LengthLimitedWriter:
+    """Text buffer with a maximum length, built up from chunks of text.
+
+    Keyword arguments:
+    maximum_length -- the content of the buffer must be shorter than this number of characters
+    """
+
+    def __init__(self, maximum_length: int) -> None:
+        self.maximum_length = maximum_length
+        self.chunks: list[str] = []
+        self.length = 0
+
+    def write(self, text: str) -> None:
+        """Append the text to the buffer, regardless of the maximum length.
+
+        Keyword arguments:
+        text -- the text to append
+        """
+        self.chunks.append(text)
+        self.length += len(text)
+
+    def write_within_limit(self, chunks) -> bool:
+        """Append the chunks of text to the buffer. If the content would reach the maximum length, stop consuming the
+        chunks, roll the buffer back to its previous content, and return False. Otherwise, return True.
+
+        Keyword arguments:
+        chunks -- iterable of the text to append
+        """
+        checkpoint_chunk_count = len(self.chunks)
+        checkpoint_length = self.length
+        for chunk in chunks:
+            self.write(text=chunk)
+            if self.length >= self.maximum_length:
+                del self.chunks[checkpoint_chunk_count:]
+                self.length = checkpoint_length
+                return False
+
+        return True
+
+    def getvalue(self) -> str:
+        """Return the content of the buffer."""
+        return "".join(self.chunks)
+
+
+# Retry urlopen after exceptions that start with the following strings
+urlopen_retry_exceptions = [
+    # urllib.error.HTTPError: HTTP Error 403: Forbidden
+    "HTTPError: HTTP Error 403",
+    # urllib.error.HTTPError: HTTP Error 500: Internal Server Error
+    "HTTPError: HTTP Error 500",
+    # urllib.error.HTTPError: HTTP Error 502: Bad Gateway
+    "HTTPError: HTTP Error 502",
+    # urllib.error.HTTPError: HTTP Error 503: Service Unavailable
+    # caused by rate limiting
+    "HTTPError: HTTP Error 503",
+    # urllib.error.HTTPError: HTTP Error 504: Gateway Timeout
+    "HTTPError: HTTP Error 504",
+    # http.client.RemoteDisconnected: Remote end closed connection without response
+    "RemoteDisconnected",
+    # ConnectionResetError: [Errno 104] Connection reset by peer
+    "ConnectionResetError",
+    # ConnectionRefusedError: [WinError 10061] No connection could be made because the target machine actively
+    # refused it
+    "ConnectionRefusedError",
+    # urllib.error.URLError: <urlopen error [WinError 10061] No connection could be made because the target
+    # machine actively refused it>
+    "URLError: <urlopen error [WinError 10061] No connection could be made because the target machine actively "
+    "refused it>",
+    # TimeoutError: The read operation timed out
+    "TimeoutError",
+    # urllib.error.URLError: <urlopen error timed out>
+    "URLError: <urlopen error timed out>",
+]
+# Matches the exception strings that start with any of the above
+urlopen_retry_pattern = re.compile(
+    pattern="(?:" + "|".join(re.escape(pattern=retry_exception) for retry_exception in urlopen_retry_exceptions) + ")"
+)
+
+
+def print_http_error_body(exception: Exception) -> None:
+    """Print the body of the error response, truncated to a length that doesn't flood the log.
+
+    Keyword arguments:
+    exception -- the exception raised for the request. Exceptions other than HTTPError (e.g., connection failures and
+                 timeouts) have no response body, so nothing is printed for them.
+    """
+    # Maximum number of characters of an error response body to print
+    maximum_error_body_length = 8192
+
+    if not isinstance(exception, urllib.error.HTTPError):
+        return
+
+    error_body = exception.fp.read().decode(encoding="utf-8", errors="ignore")
+    if len(error_body) > maximum_error_body_length:
+        error_body = error_body[:maximum_error_body_length] + "..."
+    print(error_body, flush=True)
+
+
+def determine_urlopen_retry(exception: Exception, retry_count: int = 0) -> bool:
     """Determine whether the exception warrants another attempt at opening the URL.
     If so, delay then return True. Otherwise, return False.
 
     Keyword arguments:
     exception -- the exception
+    retry_count -- number of times opening the URL has already been retried
+                   (default value: 0)
     """
-    # Retry urlopen after exceptions that start with the following strings
-    urlopen_retry_exceptions = [
-        # urllib.error.HTTPError: HTTP Error 403: Forbidden
-        "HTTPError: HTTP Error 403",
-        # urllib.error.HTTPError: HTTP Error 502: Bad Gateway
-        "HTTPError: HTTP Error 502",
-        # urllib.error.HTTPError: HTTP Error 503: Service Unavailable
-        # caused by rate limiting
-        "HTTPError: HTTP Error 503",
-        # http.client.RemoteDisconnected: Remote end closed connection without response
-        "RemoteDisconnected",
-        # ConnectionResetError: [Errno 104] Connection reset by peer
-        "ConnectionResetError",
-        # ConnectionRefusedError: [WinError 10061] No connection could be made because the target machine actively
-        # refused it
-        "ConnectionRefusedError",
-        # urllib.error.URLError: <urlopen error [WinError 10061] No connection could be made because the target
-        # machine actively refused it>
-        "<urlopen error [WinError 10061] No connection could be made because the target machine actively refused "
-        "it>",
-    ]
-
-    # Delay before retry (seconds)
-    urlopen_retry_delay = 30
-
-    exception_string = str(exception.__class__.__name__) + ": " + str(exception)
+    exception_string = f"{type(exception).__name__}: {exception}"
     logger.info(exception_string)
-    for urlopen_retry_exception in urlopen_retry_exceptions:
-        if str(exception_string).startswith(urlopen_retry_exception):
-            # These errors may only be temporary, retry
-            logger.warning("Temporarily unable to open URL (" + str(exception) + "), retrying")
-            time.sleep(urlopen_retry_delay)
-            return True
+    if urlopen_retry_pattern.match(string=exception_string):
+        # These errors may only be temporary, retry
+        logger.warning("Temporarily unable to open URL (%s), retrying", exception)
+        time.sleep(get_urlopen_retry_delay(exception=exception, retry_count=retry_count))
+        return True
 
     # Other errors are probably permanent so give up
-    if str(exception_string).startswith("HTTPError: HTTP Error 401"):
+    if exception_string.startswith("HTTPError: HTTP Error 401"):
         # Give a nice hint as to the cause of this error
         print("::error::HTTP Error 401 may be caused by providing an incorrect GitHub personal access token.")
     return False
 
 
+def get_urlopen_retry_delay(exception: Exception, retry_count: int) -> float:
+    """Return the number of seconds to wait before retrying to open the URL. The delay grows exponentially with the
+    number of retries, with random jitter added so that concurrent requests don't all retry at the same time. If the
+    server specified the delay via a Retry-After header, that is used instead. The delay never exceeds the maximum.
+
+    Keyword arguments:
+    exception -- the exception
+    retry_count -- number of times opening the URL has already been retried
+    """
+    # Delay before the first retry (seconds)
+    urlopen_retry_base_delay = 5
+    # Maximum delay before retry (seconds)
+    maximum_urlopen_retry_delay = 300
+
+    # Only HTTP error responses have headers
+    if isinstance(exception, urllib.error.HTTPError) and exception.headers is not None:
+        retry_after = exception.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return min(maximum_urlopen_retry_delay, int(retry_after))
+
+    # The jitter is added before capping, so the maximum holds
+    return min(
+        maximum_urlopen_retry_delay,
+        urlopen_retry_base_delay * 2**retry_count + random.uniform(0, urlopen_retry_base_delay),
+    )
+
+
 def get_page_count(link_header: str | None) -> int:
     """Return the number of pages of the API response.
 
@@ -730,60 +1020,108 @@ def get_page_count(link_header: str | None) -> int:
     page_count = 1
     if link_header is not None:
         # Get the pagination data
-        for link in link_header.split(","):
-            if link[-13:] == '>; rel="last"':
-                for parameter in re.split("[?&>]", link):
-                    if parameter[:5] == "page=":
-                        page_count = int(parameter.split("=")[1])
-                        break
-                break
+        last_page_link_match = last_page_link_pattern.search(string=link_header)
+        if last_page_link_match is not None:
+            page_count = int(last_page_link_match.group(1))
     return page_count
 
 
-def get_report_column_number(report, column_heading: str) -> int:
+@dataclasses.dataclass(slots=True)
+class Report:
+    """Table of report data.
+
+    Keyword arguments:
+    headings -- list of the column headings
+    heading_index -- dictionary of the column numbers of the memory data headings
+    rows -- list of the rows, each a dictionary of cell values indexed by column number. Cells of columns added after
+            the row was populated are absent.
+    """
+
+    headings: list[str]
+    heading_index: dict[str, int]
+    rows: list[dict[int, object]]
+
+
+def create_report_data(first_column_heading: str) -> Report:
+    """Return an empty report table.
+
+    Keyword arguments:
+    first_column_heading -- the text of the heading of the first column
+    """
+    return Report(headings=[first_column_heading], heading_index={}, rows=[])
+
+
+def get_report_column_number(report: Report, column_heading: str) -> int:
     """Return the column number of the given heading.
 
     Keyword arguments:
+    report -- the report to get the column number from
     column_heading -- the text of the column heading. If it doesn't exist, a column will be created with this heading.
     """
     relative_column_heading = "%"
 
-    try:
-        column_number = report[0].index(column_heading, 1)
-    except ValueError:
+    column_number = report.heading_index.get(column_heading)
+    if column_number is None:
         # There is no existing column, so create columns for relative and absolute
-        column_number = len(report[0])
-
-        # Absolute column
-        # Add the heading
-        report[0].append(column_heading)
-        # Expand the size of the final row (the current row) to match the new number of columns
-        report[len(report) - 1].append("")
+        column_number = len(report.headings)
+        report.heading_index[column_heading] = column_number
 
-        # Relative column
-        # Add the heading
-        report[0].append(relative_column_heading)
-        # Expand the size of the final row (the current row) to match the new number of columns
-        report[len(report) - 1].append("")
+        # Absolute and relative columns
+        report.headings.extend((column_heading, relative_column_heading))
 
     return column_number
 
 
+def get_report_row_list(report_data: Report):
+    """Return the report formatted as a list of rows, with the heading row first. Absent cells are filled with empty
+    strings.
+
+    Keyword arguments:
+    report_data -- the report
+    """
+    column_count = len(report_data.headings)
+    row_list: list[list[object]] = [list(report_data.headings)]
+    for row in report_data.rows:
+        row_cells: list[object] = [""] * column_count
+        for column_number, cell in row.items():
+            row_cells[column_number] = cell
+        row_list.append(row_cells)
+
+    return row_list
+
+
 def generate_markdown_table(row_list) -> str:
     """Return the data formatted as a Markdown table.
 
+    Keyword arguments:
+    row_list -- list containing the data
+    """
+    return "".join(iter_markdown_table(row_list=row_list))
+
+
+def iter_markdown_table(row_list):
+    """Return a generator that yields each line of the data formatted as a Markdown table.
+
     Keyword arguments:
     row_list -- list containing the data
     """
     # Generate heading row
-    markdown_table = "|".join([str(cell) for cell in row_list[0]]) + "\n"
+    yield "|".join(map(str, row_list[0])) + "\n"
     # Add divider row
-    markdown_table = markdown_table + "|".join(["-" for _ in row_list[0]]) + "\n"
+    yield get_markdown_table_divider(column_count=len(row_list[0])) + "\n"
     # Add data rows
     for row in row_list[1:]:
-        markdown_table = markdown_table + "|".join([str(cell) for cell in row]) + "\n"
+        yield "|".join(map(str, row)) + "\n"
 
-    return markdown_table
+
+@functools.lru_cache(maxsize=16)
+def get_markdown_table_divider(column_count: int) -> str:
+    """Return the divider row of a Markdown table.
+
+    Keyword arguments:
+    column_count -- number of columns in the table
+    """
+    return "|".join(["-"] * column_count)
 
 
 def generate_csv_table(row_list) -> str:
@@ -792,21 +1130,24 @@ def generate_csv_table(row_list) -> str:
     Keyword arguments:
     row_list -- list containing the data
     """
-    csv_string = io.StringIO()
-    csv_writer = csv.writer(csv_string, lineterminator="\n")
-    for row in row_list:
-        cleaned_row = []
-        for cell in row:
-            cleaned_cell = cell
-            if isinstance(cleaned_cell, str):
-                # The "code span" markup is not needed in the CSV report.
-                cleaned_cell = cleaned_cell.replace("`", "")
+    return "".join(iter_csv_rows(row_list=row_list))
 
-            cleaned_row.append(cleaned_cell)
 
-        csv_writer.writerow(cleaned_row)
+def iter_csv_rows(row_list):
+    """Return a generator that yields each row of the supplied data formatted as a line of CSV.
 
-    return csv_string.getvalue()
+    Keyword arguments:
+    row_list -- iterable containing the data
+    """
+    csv_string = io.StringIO()
+    csv_writer = csv.writer(csv_string, lineterminator="\n")
+    for row in row_list:
+        csv_writer.writerow(
+            [cell.translate(csv_markup_translation_table) if isinstance(cell, str) else cell for cell in row]
+        )
+        yield csv_string.getvalue()
+        csv_string.seek(0)
+        csv_string.truncate(0)
 
 
 # Only execute the following code if the script is run directly, not imported
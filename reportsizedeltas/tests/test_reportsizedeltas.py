@@ -1,8 +1,10 @@
-import distutils.dir_util
 import filecmp
+import hashlib
+import io
 import json
 import os
 import pathlib
+import shutil
 import tempfile
 import unittest.mock
 import urllib
@@ -15,7 +17,7 @@ import reportsizedeltas
 reportsizedeltas.set_verbosity(enable_verbosity=False)
 
 test_data_path = pathlib.Path(__file__).resolve().parent.joinpath("data")
-report_keys = reportsizedeltas.ReportSizeDeltas.ReportKeys()
+report_keys = reportsizedeltas.ReportSizeDeltas.ReportKeys
 
 
 def get_reportsizedeltas_object(
@@ -44,31 +46,80 @@ def directories_are_same(left_directory, right_directory) -> bool:
     left_directory -- one of the two directories to compare
     right_directory -- the other directory to compare
     """
-    filecmp.clear_cache()
-    directory_comparison = filecmp.dircmp(a=left_directory, b=right_directory)
-    if (
-        len(directory_comparison.left_only) > 0
-        or len(directory_comparison.right_only) > 0
-        or len(directory_comparison.funny_files) > 0
-    ):
-        return False
-
-    filecmp.clear_cache()
-    (_, mismatch, errors) = filecmp.cmpfiles(
-        a=left_directory, b=right_directory, common=directory_comparison.common_files, shallow=False
-    )
-    if len(mismatch) > 0 or len(errors) > 0:
-        return False
-
-    for common_dir in directory_comparison.common_dirs:
-        if not directories_are_same(
-            left_directory=left_directory.joinpath(common_dir), right_directory=right_directory.joinpath(common_dir)
+    # Walk the directory trees iteratively, comparing each pair of subdirectories
+    directory_pairs = [(left_directory, right_directory)]
+    while directory_pairs:
+        left_directory, right_directory = directory_pairs.pop()
+        directory_comparison = filecmp.dircmp(a=left_directory, b=right_directory)
+        if (
+            len(directory_comparison.left_only) > 0
+            or len(directory_comparison.right_only) > 0
+            or len(directory_comparison.funny_files) > 0
         ):
             return False
 
+        common_file_pairs = [
+            (left_directory.joinpath(common_file), right_directory.joinpath(common_file))
+            for common_file in directory_comparison.common_files
+        ]
+        # Files of different sizes can't have the same content, so check all the sizes before reading any content
+        for left_file, right_file in common_file_pairs:
+            if left_file.stat().st_size != right_file.stat().st_size:
+                return False
+        for left_file, right_file in common_file_pairs:
+            if get_file_digest(file_path=left_file) != get_file_digest(file_path=right_file):
+                return False
+
+        directory_pairs.extend(
+            (left_directory.joinpath(common_dir), right_directory.joinpath(common_dir))
+            for common_dir in directory_comparison.common_dirs
+        )
+
     return True
 
 
+def get_file_digest(file_path) -> bytes:
+    """Return the digest of the file's content.
+
+    Keyword arguments:
+    file_path -- path of the file
+    """
+    with file_path.open(mode="rb") as file:
+        return hashlib.file_digest(file, "blake2b").digest()
+
+
+def link_or_copy_file(src, dst) -> None:
+    """Hard link the file at the destination, falling back to copying it when linking is not possible (e.g., the
+    destination is on a different file system). For use as the copy_function of shutil.copytree() when staging test data
+    that is only read.
+
+    Keyword arguments:
+    src -- path of the file to stage
+    dst -- path to stage the file at
+    """
+    try:
+        os.link(src=src, dst=dst)
+    except OSError:
+        shutil.copy2(src=src, dst=dst)
+
+
+def test_link_or_copy_file(mocker, tmp_path):
+    source_path = tmp_path.joinpath("source.json")
+    source_path.write_text(data="foo")
+
+    # Linking is possible
+    linked_path = tmp_path.joinpath("linked.json")
+    link_or_copy_file(src=source_path, dst=linked_path)
+    assert linked_path.stat().st_ino == source_path.stat().st_ino
+
+    # Linking is not possible
+    mocker.patch("os.link", autospec=True, side_effect=OSError)
+    copied_path = tmp_path.joinpath("copied.json")
+    link_or_copy_file(src=source_path, dst=copied_path)
+    assert copied_path.stat().st_ino != source_path.stat().st_ino
+    assert copied_path.read_text() == "foo"
+
+
 def test_directories_are_same(tmp_path):
     left_directory = tmp_path.joinpath("left_directory")
     right_directory = tmp_path.joinpath("right_directory")
@@ -114,17 +165,26 @@ def setup_environment_variables(monkeypatch):
     return ActionInputs()
 
 
-def test_main(monkeypatch, mocker, setup_environment_variables):
-    class ReportSizeDeltas:
+class ReportSizeDeltasStub:
+    """Stub"""
+
+    def report_size_deltas(self):
         """Stub"""
+        pass  # pragma: no cover
 
-        def report_size_deltas(self):
-            """Stub"""
-            pass  # pragma: no cover
 
+@pytest.fixture
+def report_size_deltas_stub(mocker):
+    """Test fixture that replaces reportsizedeltas.ReportSizeDeltas with a stub and returns the stub object."""
+    report_size_deltas_stub = ReportSizeDeltasStub()
+    mocker.patch("reportsizedeltas.ReportSizeDeltas", autospec=True, return_value=report_size_deltas_stub)
+    mocker.patch.object(ReportSizeDeltasStub, "report_size_deltas")
+
+    return report_size_deltas_stub
+
+
+def test_main(monkeypatch, mocker, setup_environment_variables, report_size_deltas_stub):
     mocker.patch("reportsizedeltas.set_verbosity", autospec=True)
-    mocker.patch("reportsizedeltas.ReportSizeDeltas", autospec=True, return_value=ReportSizeDeltas())
-    mocker.patch.object(ReportSizeDeltas, "report_size_deltas")
     reportsizedeltas.main()
 
     reportsizedeltas.set_verbosity.assert_called_once_with(enable_verbosity=False)
@@ -133,12 +193,17 @@ def test_main(monkeypatch, mocker, setup_environment_variables):
         sketches_reports_source=setup_environment_variables.sketches_reports_source,
         token=setup_environment_variables.token,
     )
-    ReportSizeDeltas.report_size_deltas.assert_called_once()
+    report_size_deltas_stub.report_size_deltas.assert_called_once()
 
 
 @pytest.mark.parametrize("use_size_deltas_report_artifact_name", [True, False])
 def test_main_size_deltas_report_artifact_name_deprecation_warning(
-    capsys, mocker, monkeypatch, setup_environment_variables, use_size_deltas_report_artifact_name
+    capsys,
+    mocker,
+    monkeypatch,
+    setup_environment_variables,
+    report_size_deltas_stub,
+    use_size_deltas_report_artifact_name,
 ):
     size_deltas_report_artifact_pattern = "golden-size-deltas-report-artifact-name-value"
 
@@ -148,16 +213,7 @@ def test_main_size_deltas_report_artifact_name_deprecation_warning(
     else:
         expected_sketches_reports_source = setup_environment_variables.sketches_reports_source
 
-    class ReportSizeDeltas:
-        """Stub"""
-
-        def report_size_deltas(self):
-            """Stub"""
-            pass  # pragma: no cover
-
     mocker.patch("reportsizedeltas.set_verbosity", autospec=True)
-    mocker.patch("reportsizedeltas.ReportSizeDeltas", autospec=True, return_value=ReportSizeDeltas())
-    mocker.patch.object(ReportSizeDeltas, "report_size_deltas")
 
     reportsizedeltas.main()
 
@@ -239,85 +295,107 @@ def test_report_size_deltas_from_local_reports(mocker, monkeypatch):
     report_size_deltas.comment_report.assert_called_once_with(report_size_deltas, pr_number=42, report_markdown=report)
 
 
-def test_report_size_deltas_from_workflow_artifacts(mocker):
-    artifacts_data = unittest.mock.sentinel.artifacts_data
-    artifacts_folder_object = "test_artifacts_folder_object"
-    pr_head_sha = "pr-head-sha"
-    sketches_reports = [{reportsizedeltas.ReportSizeDeltas.ReportKeys.commit_hash: pr_head_sha}]
-    report = "foo report"
-    json_data = [
-        {"number": 1, "locked": True, "head": {"sha": pr_head_sha, "ref": "asdf"}, "user": {"login": "1234"}},
-        {"number": 2, "locked": False, "head": {"sha": pr_head_sha, "ref": "asdf"}, "user": {"login": "1234"}},
-    ]
+@pytest.fixture
+def workflow_artifacts_mocks(mocker):
+    """Test fixture that mocks the methods called by ReportSizeDeltas.report_size_deltas_from_workflow_artifacts() and
+    returns an object containing the test data. By default, a report is made for each of the PRs.
+    """
 
-    report_size_deltas = get_reportsizedeltas_object()
+    class WorkflowArtifactsMocks:
+        """A container for the test data"""
+
+        artifacts_data = unittest.mock.sentinel.artifacts_data
+        artifacts_folder_object = "test_artifacts_folder_object"
+        pr_head_sha = "pr-head-sha"
+        sketches_reports = [{reportsizedeltas.ReportSizeDeltas.ReportKeys.commit_hash: pr_head_sha}]
+        report = "foo report"
+        json_data = [
+            {"number": 1, "locked": False, "head": {"sha": pr_head_sha, "ref": "asdf"}, "user": {"login": "1234"}},
+            {"number": 2, "locked": False, "head": {"sha": pr_head_sha, "ref": "asdf"}, "user": {"login": "1234"}},
+        ]
+        report_size_deltas = get_reportsizedeltas_object()
 
     mocker.patch(
         "reportsizedeltas.ReportSizeDeltas.api_request",
         autospec=True,
-        return_value={"json_data": json_data, "additional_pages": True, "page_count": 1},
+        return_value={"json_data": WorkflowArtifactsMocks.json_data, "additional_pages": True, "page_count": 1},
     )
     mocker.patch("reportsizedeltas.ReportSizeDeltas.report_exists", autospec=True, return_value=False)
     mocker.patch(
         "reportsizedeltas.ReportSizeDeltas.get_artifacts_data_for_sha",
         autospec=True,
-        return_value=artifacts_data,
+        return_value=WorkflowArtifactsMocks.artifacts_data,
+    )
+    mocker.patch(
+        "reportsizedeltas.ReportSizeDeltas.get_artifacts",
+        autospec=True,
+        return_value=WorkflowArtifactsMocks.artifacts_folder_object,
+    )
+    mocker.patch(
+        "reportsizedeltas.ReportSizeDeltas.get_sketches_reports",
+        autospec=True,
+        return_value=WorkflowArtifactsMocks.sketches_reports,
+    )
+    mocker.patch(
+        "reportsizedeltas.ReportSizeDeltas.generate_report", autospec=True, return_value=WorkflowArtifactsMocks.report
     )
-    mocker.patch("reportsizedeltas.ReportSizeDeltas.get_artifacts", autospec=True, return_value=artifacts_folder_object)
-    mocker.patch("reportsizedeltas.ReportSizeDeltas.get_sketches_reports", autospec=True, return_value=sketches_reports)
-    mocker.patch("reportsizedeltas.ReportSizeDeltas.generate_report", autospec=True, return_value=report)
     mocker.patch("reportsizedeltas.ReportSizeDeltas.comment_report", autospec=True)
 
-    # Test handling of locked PR
-    mocker.resetall()
+    return WorkflowArtifactsMocks()
+
+
+def test_report_size_deltas_from_workflow_artifacts_locked_pr(workflow_artifacts_mocks):
+    report_size_deltas = workflow_artifacts_mocks.report_size_deltas
+    workflow_artifacts_mocks.json_data[0]["locked"] = True
 
     report_size_deltas.report_size_deltas_from_workflow_artifacts()
 
-    report_size_deltas.comment_report.assert_called_once_with(report_size_deltas, pr_number=2, report_markdown=report)
+    report_size_deltas.comment_report.assert_called_once_with(
+        report_size_deltas, pr_number=2, report_markdown=workflow_artifacts_mocks.report
+    )
 
-    # Test handling of existing reports
-    for pr_data in json_data:
-        pr_data["locked"] = False
+
+def test_report_size_deltas_from_workflow_artifacts_existing_report(workflow_artifacts_mocks):
+    report_size_deltas = workflow_artifacts_mocks.report_size_deltas
     reportsizedeltas.ReportSizeDeltas.report_exists.return_value = True
-    mocker.resetall()
 
     report_size_deltas.report_size_deltas_from_workflow_artifacts()
 
     report_size_deltas.comment_report.assert_not_called()
 
-    # Test handling of no report artifact
-    reportsizedeltas.ReportSizeDeltas.report_exists.return_value = False
+
+def test_report_size_deltas_from_workflow_artifacts_no_artifact(workflow_artifacts_mocks):
+    report_size_deltas = workflow_artifacts_mocks.report_size_deltas
     reportsizedeltas.ReportSizeDeltas.get_artifacts_data_for_sha.return_value = None
-    mocker.resetall()
 
     report_size_deltas.report_size_deltas_from_workflow_artifacts()
 
     report_size_deltas.comment_report.assert_not_called()
 
-    # Test handling of old sketches report artifacts
-    reportsizedeltas.ReportSizeDeltas.get_artifacts_data_for_sha.return_value = artifacts_data
+
+def test_report_size_deltas_from_workflow_artifacts_old_format(workflow_artifacts_mocks):
+    report_size_deltas = workflow_artifacts_mocks.report_size_deltas
     reportsizedeltas.ReportSizeDeltas.get_sketches_reports.return_value = None
-    mocker.resetall()
 
     report_size_deltas.report_size_deltas_from_workflow_artifacts()
 
     report_size_deltas.comment_report.assert_not_called()
 
-    # Test API/report hash mismatch
-    sketches_reports = [{reportsizedeltas.ReportSizeDeltas.ReportKeys.commit_hash: "mismatched-hash"}]
 
-    reportsizedeltas.ReportSizeDeltas.get_sketches_reports.return_value = sketches_reports
-
-    mocker.resetall()
+def test_report_size_deltas_from_workflow_artifacts_hash_mismatch(workflow_artifacts_mocks):
+    report_size_deltas = workflow_artifacts_mocks.report_size_deltas
+    reportsizedeltas.ReportSizeDeltas.get_sketches_reports.return_value = [
+        {reportsizedeltas.ReportSizeDeltas.ReportKeys.commit_hash: "mismatched-hash"}
+    ]
 
     report_size_deltas.report_size_deltas_from_workflow_artifacts()
 
     report_size_deltas.comment_report.assert_not_called()
 
-    # Test making reports
-    sketches_reports = [{reportsizedeltas.ReportSizeDeltas.ReportKeys.commit_hash: pr_head_sha}]
-    reportsizedeltas.ReportSizeDeltas.get_sketches_reports.return_value = sketches_reports
-    mocker.resetall()
+
+def test_report_size_deltas_from_workflow_artifacts(workflow_artifacts_mocks):
+    report_size_deltas = workflow_artifacts_mocks.report_size_deltas
+    json_data = workflow_artifacts_mocks.json_data
 
     report_size_deltas.report_size_deltas_from_workflow_artifacts()
 
@@ -339,21 +417,52 @@ def test_report_size_deltas_from_workflow_artifacts(mocker):
             )
         )
         get_sketches_reports_calls.append(
-            unittest.mock.call(report_size_deltas, artifacts_folder_object=artifacts_folder_object)
+            unittest.mock.call(
+                report_size_deltas, artifacts_folder_object=workflow_artifacts_mocks.artifacts_folder_object
+            )
+        )
+        generate_report_calls.append(
+            unittest.mock.call(report_size_deltas, sketches_reports=workflow_artifacts_mocks.sketches_reports)
         )
-        generate_report_calls.append(unittest.mock.call(report_size_deltas, sketches_reports=sketches_reports))
         comment_report_calls.append(
-            unittest.mock.call(report_size_deltas, pr_number=pr_data["number"], report_markdown=report)
+            unittest.mock.call(
+                report_size_deltas, pr_number=pr_data["number"], report_markdown=workflow_artifacts_mocks.report
+            )
         )
-    report_size_deltas.report_exists.assert_has_calls(calls=report_exists_calls)
-    report_size_deltas.get_artifacts_data_for_sha.assert_has_calls(calls=get_artifacts_data_for_sha_calls)
-    report_size_deltas.get_artifacts.assert_called_with(report_size_deltas, artifacts_data=artifacts_data)
-    report_size_deltas.get_sketches_reports.assert_has_calls(calls=get_sketches_reports_calls)
-    report_size_deltas.generate_report.assert_has_calls(calls=generate_report_calls)
-    report_size_deltas.comment_report.assert_has_calls(calls=comment_report_calls)
+    # The PRs are processed concurrently, so the order of the calls is not deterministic
+    report_size_deltas.report_exists.assert_has_calls(calls=report_exists_calls, any_order=True)
+    report_size_deltas.get_artifacts_data_for_sha.assert_has_calls(
+        calls=get_artifacts_data_for_sha_calls, any_order=True
+    )
+    report_size_deltas.get_artifacts.assert_called_with(
+        report_size_deltas, artifacts_data=workflow_artifacts_mocks.artifacts_data
+    )
+    report_size_deltas.get_sketches_reports.assert_has_calls(calls=get_sketches_reports_calls, any_order=True)
+    report_size_deltas.generate_report.assert_has_calls(calls=generate_report_calls, any_order=True)
+    report_size_deltas.comment_report.assert_has_calls(calls=comment_report_calls, any_order=True)
+
+
+def test_report_size_deltas_from_workflow_artifacts_failure(mocker):
+    json_data = [{"number": 1, "locked": False, "head": {"sha": "pr-head-sha", "ref": "asdf"}, "user": {"login": "1"}}]
+
+    report_size_deltas = get_reportsizedeltas_object()
+
+    mocker.patch(
+        "reportsizedeltas.ReportSizeDeltas.api_request",
+        autospec=True,
+        return_value={"json_data": json_data, "additional_pages": False, "page_count": 1},
+    )
+    mocker.patch("reportsizedeltas.ReportSizeDeltas.get_pr_report", autospec=True, side_effect=SystemExit(0))
+    mocker.patch("reportsizedeltas.ReportSizeDeltas.comment_report", autospec=True)
+
+    # Exceptions in the worker threads are passed on to the caller
+    with pytest.raises(expected_exception=SystemExit, match="0"):
+        report_size_deltas.report_size_deltas_from_workflow_artifacts()
+
+    report_size_deltas.comment_report.assert_not_called()
 
 
-def test_report_exists():
+def test_report_exists(mocker):
     repository_name = "test_name/test_repo"
     pr_number = 42
     pr_head_sha = "foo123"
@@ -361,20 +470,26 @@ def test_report_exists():
     report_size_deltas = get_reportsizedeltas_object(repository_name=repository_name)
 
     json_data = [{"body": "foo123"}, {"body": report_size_deltas.report_key_beginning + pr_head_sha + "foo"}]
-    report_size_deltas.api_request = unittest.mock.MagicMock(
-        return_value={"json_data": json_data, "additional_pages": False, "page_count": 1}
+    api_request = mocker.patch.object(
+        reportsizedeltas.ReportSizeDeltas,
+        "api_request",
+        autospec=True,
+        return_value={"json_data": json_data, "additional_pages": False, "page_count": 1},
     )
 
     assert report_size_deltas.report_exists(pr_number=pr_number, pr_head_sha=pr_head_sha)
 
-    report_size_deltas.api_request.assert_called_once_with(
-        request="repos/" + repository_name + "/issues/" + str(pr_number) + "/comments", page_number=1
+    api_request.assert_called_once_with(
+        report_size_deltas,
+        request="repos/" + repository_name + "/issues/" + str(pr_number) + "/comments",
+        request_parameters=None,
+        page_number=1,
     )
 
     assert not report_size_deltas.report_exists(pr_number=pr_number, pr_head_sha="asdf")
 
 
-def test_get_artifacts_data_for_sha():
+def test_get_artifacts_data_for_sha(mocker):
     repository_name = "test_name/test_repo"
     pr_user_login = "test_pr_user_login"
     pr_head_ref = "test_pr_head_ref"
@@ -385,10 +500,15 @@ def test_get_artifacts_data_for_sha():
     report_size_deltas = get_reportsizedeltas_object(repository_name=repository_name)
 
     json_data = {"workflow_runs": [{"head_sha": "foo123", "id": "1234"}, {"head_sha": pr_head_sha, "id": run_id}]}
-    report_size_deltas.api_request = unittest.mock.MagicMock(
-        return_value={"json_data": json_data, "additional_pages": True, "page_count": 3}
+    api_request = mocker.patch.object(
+        reportsizedeltas.ReportSizeDeltas,
+        "api_request",
+        autospec=True,
+        return_value={"json_data": json_data, "additional_pages": True, "page_count": 3},
+    )
+    get_artifacts_data_for_run = mocker.patch.object(
+        reportsizedeltas.ReportSizeDeltas, "get_artifacts_data_for_run", autospec=True, return_value=None
     )
-    report_size_deltas.get_artifacts_data_for_run = unittest.mock.MagicMock(return_value=None)
 
     # No SHA match
     assert (
@@ -400,13 +520,20 @@ def test_get_artifacts_data_for_sha():
 
     # Test pagination
     request = "repos/" + repository_name + "/actions/runs"
-    request_parameters = "actor=" + pr_user_login + "&branch=" + pr_head_ref + "&event=pull_request&status=completed"
+    request_parameters = {
+        "actor": pr_user_login,
+        "branch": pr_head_ref,
+        "event": "pull_request",
+        "status": "completed",
+        "head_sha": "foosha",
+    }
     calls = [
-        unittest.mock.call(request=request, request_parameters=request_parameters, page_number=1),
-        unittest.mock.call(request=request, request_parameters=request_parameters, page_number=2),
-        unittest.mock.call(request=request, request_parameters=request_parameters, page_number=3),
+        unittest.mock.call(report_size_deltas, request=request, request_parameters=request_parameters, page_number=1),
+        unittest.mock.call(report_size_deltas, request=request, request_parameters=request_parameters, page_number=2),
+        unittest.mock.call(report_size_deltas, request=request, request_parameters=request_parameters, page_number=3),
     ]
-    report_size_deltas.api_request.assert_has_calls(calls)
+    # Pages after the first are requested concurrently
+    api_request.assert_has_calls(calls, any_order=True)
 
     # SHA match, but no artifact for run
     assert (
@@ -416,7 +543,8 @@ def test_get_artifacts_data_for_sha():
         is None
     )
 
-    report_size_deltas.get_artifacts_data_for_run = unittest.mock.MagicMock(return_value=test_artifacts_data)
+    get_artifacts_data_for_run.reset_mock()
+    get_artifacts_data_for_run.return_value = test_artifacts_data
 
     # SHA match, artifact match
     assert test_artifacts_data == (
@@ -425,7 +553,20 @@ def test_get_artifacts_data_for_sha():
         )
     )
 
-    report_size_deltas.get_artifacts_data_for_run.assert_called_once_with(run_id=run_id)
+    get_artifacts_data_for_run.assert_called_once_with(report_size_deltas, run_id=run_id)
+
+    # Multiple runs for SHA, the artifacts of the first run with a match are used
+    json_data = {"workflow_runs": [{"head_sha": pr_head_sha, "id": "1234"}, {"head_sha": pr_head_sha, "id": run_id}]}
+    api_request.return_value = {"json_data": json_data, "additional_pages": False, "page_count": 1}
+    get_artifacts_data_for_run.side_effect = lambda self, run_id: {
+        "1234": None,
+        "4567": test_artifacts_data,
+    }[run_id]
+    assert test_artifacts_data == (
+        report_size_deltas.get_artifacts_data_for_sha(
+            pr_user_login=pr_user_login, pr_head_ref=pr_head_ref, pr_head_sha=pr_head_sha
+        )
+    )
 
 
 @pytest.mark.parametrize(
@@ -448,6 +589,7 @@ def test_get_artifacts_data_for_sha():
             [{"expired": False, "name": "artifact-prefix-foo"}, {"expired": False, "name": "artifact-prefix-bar"}],
         ),
     ],
+    ids=["expired-artifact", "no-artifacts", "explicit-name", "regular-expression"],
 )
 def test_get_artifacts_data_for_run(sketches_reports_source, artifacts_data, report_artifacts_data_assertion):
     repository_name = "test_name/test_repo"
@@ -465,32 +607,50 @@ def test_get_artifacts_data_for_run(sketches_reports_source, artifacts_data, rep
     assert report_size_deltas.get_artifacts_data_for_run(run_id=run_id) == report_artifacts_data_assertion
 
     report_size_deltas.api_request.assert_called_once_with(
-        request="repos/" + repository_name + "/actions/runs/" + str(run_id) + "/artifacts", page_number=1
+        request="repos/" + repository_name + "/actions/runs/" + str(run_id) + "/artifacts",
+        request_parameters=None,
+        page_number=1,
     )
 
 
-@pytest.mark.parametrize("artifacts_testdata", ["multiple-artifacts", "single-artifact"])
-def test_get_artifacts_success(tmp_path, artifacts_testdata):
+@pytest.fixture(scope="session", params=["multiple-artifacts", "single-artifact"])
+def artifact_archives(request, tmp_path_factory):
+    """Test fixture that creates the archive files of the test artifacts once per session and returns a tuple of the
+    artifacts data and the path of the artifacts source folder.
+    """
     artifacts_data = []
 
     # Create archive files
-    artifacts_source_path = test_data_path.joinpath("test_get_artifacts", artifacts_testdata)
-    artifact_destination_path = tmp_path.joinpath("url_path")
-    artifact_destination_path.mkdir()
+    artifacts_source_path = test_data_path.joinpath("test_get_artifacts", request.param)
+    artifact_destination_path = tmp_path_factory.mktemp(basename="url_path")
     for artifact_source_path in artifacts_source_path.iterdir():
         artifact_name = artifact_source_path.name
         artifact_archive_destination_path = artifact_destination_path.joinpath(artifact_name + ".zip")
-        with zipfile.ZipFile(file=artifact_archive_destination_path, mode="a") as zip_ref:
+        # The test data is small, so compression would only add time
+        with zipfile.ZipFile(
+            file=artifact_archive_destination_path, mode="w", compression=zipfile.ZIP_STORED
+        ) as zip_ref:
+            # The test data files are small, so read each into memory in one go. The folders are created on extraction.
             for artifact_file in artifact_source_path.rglob("*"):
-                zip_ref.write(filename=artifact_file, arcname=artifact_file.relative_to(artifact_source_path))
+                if artifact_file.is_file():
+                    zip_ref.writestr(
+                        zinfo_or_arcname=artifact_file.relative_to(artifact_source_path).as_posix(),
+                        data=artifact_file.read_bytes(),
+                    )
 
         artifacts_data.append(
             {
-                "archive_download_url": artifact_destination_path.joinpath(artifact_name + ".zip").as_uri(),
+                "archive_download_url": artifact_archive_destination_path.as_uri(),
                 "name": artifact_name,
             }
         )
 
+    return artifacts_data, artifacts_source_path
+
+
+def test_get_artifacts_success(artifact_archives):
+    artifacts_data, artifacts_source_path = artifact_archives
+
     report_size_deltas = get_reportsizedeltas_object()
 
     artifacts_folder_object = report_size_deltas.get_artifacts(artifacts_data=artifacts_data)
@@ -502,47 +662,62 @@ def test_get_artifacts_success(tmp_path, artifacts_testdata):
         )
 
 
-def test_get_artifacts_failure():
+def test_get_artifacts_failure(mocker):
     artifacts_data = [
         {
-            "archive_download_url": "http://httpstat.us/404",
+            "archive_download_url": "https://example.com/artifact.zip",
             "name": "artifact_name",
         }
     ]
 
     report_size_deltas = get_reportsizedeltas_object()
 
+    mocker.patch("urllib.request.urlopen", autospec=True, side_effect=urllib.error.URLError(reason="foo"))
+
     with pytest.raises(expected_exception=urllib.error.URLError):
         report_size_deltas.get_artifacts(artifacts_data=artifacts_data)
 
+    urllib.request.urlopen.assert_called_once()
+
+
+@pytest.fixture(scope="session")
+def golden_sketches_reports():
+    """Test fixture that loads the golden sketches reports once per session and returns them in a dictionary, indexed by
+    the name of the test data folder.
+    """
+    return {
+        golden_sketches_reports_path.parent.name: json.loads(golden_sketches_reports_path.read_bytes())
+        for golden_sketches_reports_path in test_data_path.joinpath("test_get_sketches_reports").glob(
+            "*/golden-sketches-reports.json"
+        )
+    }
+
 
 @pytest.mark.parametrize(
     "test_data_folder_name",
     ["old-report-format", "single-artifact", "multiple-artifacts", "artifact-contains-folder"],
+    ids=["old-report-format", "single-artifact", "multiple-artifacts", "artifact-contains-folder"],
 )
-def test_get_sketches_reports(test_data_folder_name):
-    current_test_data_path = test_data_path.joinpath("test_get_sketches_reports", test_data_folder_name)
+def test_get_sketches_reports(tmp_path, golden_sketches_reports, test_data_folder_name):
     report_size_deltas = get_reportsizedeltas_object()
 
-    artifacts_folder_object = tempfile.TemporaryDirectory(prefix="test_reportsizedeltas-")
-    try:
-        distutils.dir_util.copy_tree(
-            src=str(current_test_data_path.joinpath("artifacts")), dst=artifacts_folder_object.name
-        )
-    except Exception:  # pragma: no cover
-        artifacts_folder_object.cleanup()
-        raise
+    artifacts_folder_object = tempfile.TemporaryDirectory(dir=tmp_path)
+    shutil.copytree(
+        src=test_data_path.joinpath("test_get_sketches_reports", test_data_folder_name, "artifacts"),
+        dst=artifacts_folder_object.name,
+        dirs_exist_ok=True,
+        copy_function=link_or_copy_file,
+    )
     sketches_reports = report_size_deltas.get_sketches_reports(artifacts_folder_object=artifacts_folder_object)
 
-    with open(file=current_test_data_path.joinpath("golden-sketches-reports.json")) as golden_sketches_reports_file:
-        assert sketches_reports == json.load(golden_sketches_reports_file)
+    assert sketches_reports == golden_sketches_reports[test_data_folder_name]
 
 
 @pytest.mark.parametrize(
     "report_data, fqbn_data, expected_report_data",
     [
         (
-            [["Board"]],
+            reportsizedeltas.Report(headings=["Board"], heading_index={}, rows=[]),
             {
                 report_keys.board: "arduino:avr:uno",
                 report_keys.sizes: [
@@ -564,28 +739,34 @@ def test_get_sketches_reports(test_data_folder_name):
                     },
                 ],
             },
-            [
-                ["Board", "flash", "%", "RAM for global variables", "%"],
-                [
-                    "`arduino:avr:uno`",
-                    ":green_heart: -994 - -994",
-                    "-3.08 - -3.08",
-                    ":green_heart: -175 - -175",
-                    "-8.54 - -8.54",
+            reportsizedeltas.Report(
+                headings=["Board", "flash", "%", "RAM for global variables", "%"],
+                heading_index={"flash": 1, "RAM for global variables": 3},
+                rows=[
+                    {
+                        0: "`arduino:avr:uno`",
+                        1: ":green_heart: -994 - -994",
+                        2: "-3.08 - -3.08",
+                        3: ":green_heart: -175 - -175",
+                        4: "-8.54 - -8.54",
+                    }
                 ],
-            ],
+            ),
         ),
         (
-            [
-                ["Board", "flash", "%", "RAM for global variables", "%"],
-                [
-                    "`arduino:avr:uno`",
-                    ":green_heart: -994 - -994",
-                    "-3.08 - -3.08",
-                    ":green_heart: -175 - -175",
-                    "-8.54 - -8.54",
+            reportsizedeltas.Report(
+                headings=["Board", "flash", "%", "RAM for global variables", "%"],
+                heading_index={"flash": 1, "RAM for global variables": 3},
+                rows=[
+                    {
+                        0: "`arduino:avr:uno`",
+                        1: ":green_heart: -994 - -994",
+                        2: "-3.08 - -3.08",
+                        3: ":green_heart: -175 - -175",
+                        4: "-8.54 - -8.54",
+                    }
                 ],
-            ],
+            ),
             {
                 report_keys.board: "arduino:mbed_portenta:envie_m7",
                 report_keys.sizes: [
@@ -599,19 +780,23 @@ def test_get_sketches_reports(test_data_folder_name):
                     },
                 ],
             },
-            [
-                ["Board", "flash", "%", "RAM for global variables", "%"],
-                [
-                    "`arduino:avr:uno`",
-                    ":green_heart: -994 - -994",
-                    "-3.08 - -3.08",
-                    ":green_heart: -175 - -175",
-                    "-8.54 - -8.54",
+            reportsizedeltas.Report(
+                headings=["Board", "flash", "%", "RAM for global variables", "%"],
+                heading_index={"flash": 1, "RAM for global variables": 3},
+                rows=[
+                    {
+                        0: "`arduino:avr:uno`",
+                        1: ":green_heart: -994 - -994",
+                        2: "-3.08 - -3.08",
+                        3: ":green_heart: -175 - -175",
+                        4: "-8.54 - -8.54",
+                    },
+                    {0: "`arduino:mbed_portenta:envie_m7`", 1: "N/A", 2: "N/A", 3: "N/A", 4: "N/A"},
                 ],
-                ["`arduino:mbed_portenta:envie_m7`", "N/A", "N/A", "N/A", "N/A"],
-            ],
+            ),
         ),
     ],
+    ids=["first-row", "no-delta-data"],
 )
 def test_add_summary_report_row(report_data, fqbn_data, expected_report_data):
     report_size_deltas = get_reportsizedeltas_object()
@@ -624,7 +809,7 @@ def test_add_summary_report_row(report_data, fqbn_data, expected_report_data):
     "report_data, fqbn_data, expected_report_data",
     [
         (
-            [["Board"]],
+            reportsizedeltas.Report(headings=["Board"], heading_index={}, rows=[]),
             {
                 report_keys.board: "arduino:avr:leonardo",
                 report_keys.sketches: [
@@ -650,16 +835,30 @@ def test_add_summary_report_row(report_data, fqbn_data, expected_report_data):
                     }
                 ],
             },
-            [
-                ["Board", "`examples/Foo`<br>flash", "%", "`examples/Foo`<br>RAM for global variables", "%"],
-                ["`arduino:avr:leonardo`", -12, -0.05, 0, -0.0],
-            ],
+            reportsizedeltas.Report(
+                headings=[
+                    "Board",
+                    "`examples/Foo`<br>flash",
+                    "%",
+                    "`examples/Foo`<br>RAM for global variables",
+                    "%",
+                ],
+                heading_index={"`examples/Foo`<br>flash": 1, "`examples/Foo`<br>RAM for global variables": 3},
+                rows=[{0: "`arduino:avr:leonardo`", 1: -12, 2: -0.05, 3: 0, 4: -0.0}],
+            ),
         ),
         (
-            [
-                ["Board", "`examples/Foo`<br>flash", "%", "`examples/Foo`<br>RAM for global variables", "%"],
-                ["`arduino:avr:leonardo`", -12, -0.05, 0, -0.0],
-            ],
+            reportsizedeltas.Report(
+                headings=[
+                    "Board",
+                    "`examples/Foo`<br>flash",
+                    "%",
+                    "`examples/Foo`<br>RAM for global variables",
+                    "%",
+                ],
+                heading_index={"`examples/Foo`<br>flash": 1, "`examples/Foo`<br>RAM for global variables": 3},
+                rows=[{0: "`arduino:avr:leonardo`", 1: -12, 2: -0.05, 3: 0, 4: -0.0}],
+            ),
             {
                 report_keys.board: "arduino:mbed_portenta:envie_m7",
                 report_keys.sketches: [
@@ -681,13 +880,23 @@ def test_add_summary_report_row(report_data, fqbn_data, expected_report_data):
                     }
                 ],
             },
-            [
-                ["Board", "`examples/Foo`<br>flash", "%", "`examples/Foo`<br>RAM for global variables", "%"],
-                ["`arduino:avr:leonardo`", -12, -0.05, 0, -0.0],
-                ["`arduino:mbed_portenta:envie_m7`", "N/A", "N/A", "N/A", "N/A"],
-            ],
+            reportsizedeltas.Report(
+                headings=[
+                    "Board",
+                    "`examples/Foo`<br>flash",
+                    "%",
+                    "`examples/Foo`<br>RAM for global variables",
+                    "%",
+                ],
+                heading_index={"`examples/Foo`<br>flash": 1, "`examples/Foo`<br>RAM for global variables": 3},
+                rows=[
+                    {0: "`arduino:avr:leonardo`", 1: -12, 2: -0.05, 3: 0, 4: -0.0},
+                    {0: "`arduino:mbed_portenta:envie_m7`", 1: "N/A", 2: "N/A", 3: "N/A", 4: "N/A"},
+                ],
+            ),
         ),
     ],
+    ids=["first-row", "no-delta-data"],
 )
 def test_add_detailed_report_row(report_data, fqbn_data, expected_report_data):
     report_size_deltas = get_reportsizedeltas_object()
@@ -696,7 +905,7 @@ def test_add_detailed_report_row(report_data, fqbn_data, expected_report_data):
     assert report_data == expected_report_data
 
 
-def test_generate_report():
+def test_generate_report(tmp_path):
     sketches_report_path = test_data_path.joinpath("size-deltas-reports-new")
     expected_deltas_report = (
         "**Memory usage change @ d8fd302**\n\n"
@@ -728,12 +937,13 @@ def test_generate_report():
 
     report_size_deltas = get_reportsizedeltas_object()
 
-    artifacts_folder_object = tempfile.TemporaryDirectory(prefix="test_reportsizedeltas-")
-    try:
-        distutils.dir_util.copy_tree(src=str(sketches_report_path), dst=artifacts_folder_object.name)
-    except Exception:  # pragma: no cover
-        artifacts_folder_object.cleanup()
-        raise
+    artifacts_folder_object = tempfile.TemporaryDirectory(dir=tmp_path)
+    shutil.copytree(
+        src=sketches_report_path,
+        dst=artifacts_folder_object.name,
+        dirs_exist_ok=True,
+        copy_function=link_or_copy_file,
+    )
     sketches_reports = report_size_deltas.get_sketches_reports(artifacts_folder_object=artifacts_folder_object)
 
     report = report_size_deltas.generate_report(sketches_reports=sketches_reports)
@@ -762,7 +972,7 @@ def test_get_summary_value(show_emoji, minimum, maximum, expected_value):
 
 def test_comment_report():
     pr_number = 42
-    report_markdown = "test_report_markdown"
+    report_markdown = "test_report_markdown \u2264 \U0001f49a"
     repository_name = "test_user/test_repo"
 
     report_size_deltas = get_reportsizedeltas_object(repository_name=repository_name)
@@ -771,20 +981,19 @@ def test_comment_report():
 
     report_size_deltas.comment_report(pr_number=pr_number, report_markdown=report_markdown)
 
-    report_data = {"body": report_markdown}
-    report_data = json.dumps(obj=report_data)
-    report_data = report_data.encode(encoding="utf-8")
-
     report_size_deltas.http_request.assert_called_once_with(
         url="https://api.github.com/repos/" + repository_name + "/issues/" + str(pr_number) + "/comments",
-        data=report_data,
+        data=unittest.mock.ANY,
     )
+    # Compare the decoded data so the test doesn't depend on the serializer's formatting
+    report_data = report_size_deltas.http_request.call_args.kwargs["data"]
+    assert json.loads(report_data.decode(encoding="utf-8")) == {"body": report_markdown}
 
 
 def test_api_request():
     response_data = {"json_data": {"foo": "bar"}, "additional_pages": False, "page_count": 1}
     request = "test_request"
-    request_parameters = "test_parameters"
+    request_parameters = {"foo": "bar&baz=qux"}
     page_number = 1
 
     report_size_deltas = get_reportsizedeltas_object()
@@ -795,39 +1004,86 @@ def test_api_request():
         request=request, request_parameters=request_parameters, page_number=page_number
     )
     report_size_deltas.get_json_response.assert_called_once_with(
-        url="https://api.github.com/"
-        + request
-        + "?"
-        + request_parameters
-        + "&page="
-        + str(page_number)
-        + "&per_page=100"
+        url="https://api.github.com/" + request + "?foo=bar%26baz%3Dqux&page=" + str(page_number) + "&per_page=100"
+    )
+
+    # No request parameters
+    report_size_deltas.get_json_response.reset_mock()
+    report_size_deltas.api_request(request=request, page_number=page_number)
+    report_size_deltas.get_json_response.assert_called_once_with(
+        url="https://api.github.com/" + request + "?page=" + str(page_number) + "&per_page=100"
+    )
+
+
+def test_api_request_pages():
+    request = "test_request"
+    request_parameters = {"foo": "bar"}
+
+    report_size_deltas = get_reportsizedeltas_object()
+
+    def api_request(request, request_parameters, page_number):
+        return {"json_data": [page_number], "additional_pages": True, "page_count": 3}
+
+    report_size_deltas.api_request = unittest.mock.MagicMock(side_effect=api_request)
+
+    # Pages are yielded in order
+    assert [[1], [2], [3]] == list(
+        report_size_deltas.api_request_pages(request=request, request_parameters=request_parameters)
+    )
+    report_size_deltas.api_request.assert_has_calls(
+        calls=[
+            unittest.mock.call(request=request, request_parameters=request_parameters, page_number=page_number)
+            for page_number in [1, 2, 3]
+        ],
+        any_order=True,
+    )
+
+    # Reverse order
+    assert [[3], [2], [1]] == list(
+        report_size_deltas.api_request_pages(request=request, request_parameters=request_parameters, reverse=True)
+    )
+
+    # Single page
+    report_size_deltas.api_request = unittest.mock.MagicMock(
+        return_value={"json_data": [42], "additional_pages": False, "page_count": 1}
     )
+    assert [[42]] == list(report_size_deltas.api_request_pages(request=request))
+    report_size_deltas.api_request.assert_called_once_with(request=request, request_parameters=None, page_number=1)
 
+    # No results
+    report_size_deltas.api_request = unittest.mock.MagicMock(
+        return_value={"json_data": [], "additional_pages": False, "page_count": 0}
+    )
+    assert [[]] == list(report_size_deltas.api_request_pages(request=request))
 
-def test_get_json_response():
+
+def test_get_json_response(mocker):
     url = "test_url"
 
     report_size_deltas = get_reportsizedeltas_object()
 
-    invalid_response = {"headers": {"Link": None}, "body": "foo"}
+    invalid_response = {"headers": {"Link": None}, "body": b"foo"}
     report_size_deltas.http_request = unittest.mock.MagicMock(return_value=invalid_response)
 
     # HTTP response body is not JSON
     with pytest.raises(expected_exception=json.decoder.JSONDecodeError):
         report_size_deltas.get_json_response(url=url)
 
-    response = {"headers": {"Link": None}, "body": "[]"}
+    response = {"headers": {"Link": None}, "body": b"[]"}
     report_size_deltas.http_request = unittest.mock.MagicMock(return_value=response)
 
     # Empty body
+    json_loads_spy = mocker.spy(json, "loads")
     response_data = report_size_deltas.get_json_response(url=url)
+    # The empty list is recognized without decoding
+    json_loads_spy.assert_not_called()
+    mocker.stop(json_loads_spy)
     assert json.loads(response["body"]) == response_data["json_data"]
     assert not response_data["additional_pages"]
     assert 0 == response_data["page_count"]
     report_size_deltas.http_request.assert_called_once_with(url=url)
 
-    response = {"headers": {"Link": None}, "body": "[42]"}
+    response = {"headers": {"Link": None}, "body": b"[42]"}
     report_size_deltas.http_request = unittest.mock.MagicMock(return_value=response)
 
     # Non-empty body, Link field is None
@@ -841,7 +1097,7 @@ def test_get_json_response():
             "Link": '<https://api.github.com/repositories/919161/pulls?page=2>; rel="next", '
             '"<https://api.github.com/repositories/919161/pulls?page=4>; rel="last"'
         },
-        "body": "[42]",
+        "body": b"[42]",
     }
     report_size_deltas.http_request = unittest.mock.MagicMock(return_value=response)
 
@@ -865,13 +1121,15 @@ def test_http_request():
     report_size_deltas = get_reportsizedeltas_object()
 
     report_size_deltas.raw_http_request = unittest.mock.MagicMock()
+    report_size_deltas.raw_http_request.return_value.__enter__.return_value.read.return_value = b"[42]"
 
-    report_size_deltas.http_request(url=url, data=data)
+    # The body is returned without decoding
+    assert b"[42]" == report_size_deltas.http_request(url=url, data=data)["body"]
 
-    report_size_deltas.raw_http_request.assert_called_once_with(url=url, data=data)
+    report_size_deltas.raw_http_request.assert_called_once_with(url=url, data=data, headers=None)
 
 
-def test_raw_http_request(mocker):
+def test_raw_http_request(capsys, mocker):
     user_name = "test_user"
     token = "test_token"
     url = "https://api.github.com/repo/foo/bar"
@@ -883,7 +1141,7 @@ def test_raw_http_request(mocker):
 
     mocker.patch.object(Request, "add_unredirected_header")
     request = Request()
-    urlopen_return = unittest.mock.sentinel.urlopen_return
+    urlopen_return = unittest.mock.MagicMock(headers={"X-RateLimit-Remaining": "4321"})
 
     report_size_deltas = get_reportsizedeltas_object(repository_name=user_name + "/FooRepositoryName", token=token)
 
@@ -905,28 +1163,78 @@ def test_raw_http_request(mocker):
             unittest.mock.call(key="X-GitHub-Api-Version", val="2022-11-28"),
         ]
     )
+    # The default headers are built once and reused
+    assert report_size_deltas.default_request_headers is report_size_deltas.default_request_headers
     # URL is subject to GitHub API rate limiting
     report_size_deltas.handle_rate_limiting.assert_called_once()
+    assert report_size_deltas.rate_limit_remaining == 4321
 
     # URL is not subject to GitHub API rate limiting
     mocker.resetall()
     url = "https://api.github.com/rate_limit"
     assert report_size_deltas.raw_http_request(url=url, data=data) == urlopen_return
     report_size_deltas.handle_rate_limiting.assert_not_called()
-    urllib.request.urlopen.assert_called_once_with(url=request)
+    urllib.request.urlopen.assert_called_once_with(url=request, timeout=30)
+    # The rate limit API's response is handled by handle_rate_limiting()
+    report_size_deltas.rate_limit_remaining = None
+    report_size_deltas.raw_http_request(url=url, data=data)
+    assert report_size_deltas.rate_limit_remaining is None
+
+    # Additional headers
+    mocker.resetall()
+    report_size_deltas.raw_http_request(url=url, data=data, headers={"Accept-Encoding": "identity"})
+    request.add_unredirected_header.assert_called_with(key="Accept-Encoding", val="identity")
+
+    # Additional header replaces a default header
+    mocker.resetall()
+    report_size_deltas.raw_http_request(url=url, data=data, headers={"Accept": "application/octet-stream"})
+    assert request.add_unredirected_header.call_count == 4
+    request.add_unredirected_header.assert_any_call(key="Accept", val="application/octet-stream")
 
     # urllib.request.urlopen() has non-recoverable exception
     urllib.request.urlopen.side_effect = urllib.error.HTTPError(
-        url="http://example.com", code=404, msg="", hdrs=None, fp=None
+        url="http://example.com", code=404, msg="", hdrs=None, fp=io.BytesIO(b"foo\n" + b"x" * 9000)
     )
     mocker.patch("reportsizedeltas.determine_urlopen_retry", autospec=True, return_value=False)
+    capsys.readouterr()
     with pytest.raises(expected_exception=urllib.error.HTTPError):
         report_size_deltas.raw_http_request(url=url, data=data)
+    # The error response body is printed, truncated
+    assert capsys.readouterr().out.endswith("foo\n" + "x" * 8188 + "...\n")
 
     # urllib.request.urlopen() has potentially recoverable exceptions, but exceeds retry count
+    reportsizedeltas.determine_urlopen_retry.reset_mock()
     reportsizedeltas.determine_urlopen_retry.return_value = True
     with pytest.raises(expected_exception=urllib.error.HTTPError):
         report_size_deltas.raw_http_request(url=url, data=data)
+    # The retry count is passed on so that the delay can back off. There is no wait after the last attempt.
+    assert [call.kwargs["retry_count"] for call in reportsizedeltas.determine_urlopen_retry.call_args_list] == [
+        0,
+        1,
+        2,
+    ]
+
+
+@pytest.mark.parametrize(
+    "exception",
+    [TimeoutError("The read operation timed out"), urllib.error.URLError(reason=TimeoutError("timed out"))],
+    ids=["read-timeout", "connect-timeout"],
+)
+def test_raw_http_request_timeout(capsys, mocker, exception):
+    url = "https://api.github.com/rate_limit"
+
+    report_size_deltas = get_reportsizedeltas_object()
+
+    sleep = mocker.patch("time.sleep", autospec=True)
+    urlopen = mocker.patch.object(urllib.request, "urlopen", autospec=True, side_effect=exception)
+
+    # The attempt is retried, then the exception is raised once the maximum retries is exceeded
+    with pytest.raises(expected_exception=type(exception)):
+        report_size_deltas.raw_http_request(url=url)
+    assert urlopen.call_count == 4
+    # There is no wait after the last attempt
+    assert sleep.call_count == 3
+    assert f"::error::{type(exception).__name__}: {exception}" in capsys.readouterr().out
 
 
 def test_handle_rate_limiting():
@@ -943,13 +1251,107 @@ def test_handle_rate_limiting():
     json_data["json_data"]["resources"]["core"]["remaining"] = 42
     report_size_deltas.handle_rate_limiting()
 
+    # Remaining request count is below the threshold, so the check is not skipped
+    report_size_deltas.get_json_response.reset_mock()
+    report_size_deltas.handle_rate_limiting()
+    report_size_deltas.get_json_response.assert_called_once_with(url="https://api.github.com/rate_limit")
+
+    # Recent check with plenty of remaining requests
+    json_data["json_data"]["resources"]["core"]["remaining"] = 1000
+    report_size_deltas.handle_rate_limiting()
+    report_size_deltas.get_json_response.reset_mock()
+    report_size_deltas.handle_rate_limiting()
+    report_size_deltas.get_json_response.assert_not_called()
+    assert report_size_deltas.rate_limit_remaining == 999
+
+    # Last check has expired
+    report_size_deltas.rate_limit_check_time -= report_size_deltas.rate_limit_check_interval
+    report_size_deltas.handle_rate_limiting()
+    report_size_deltas.get_json_response.assert_called_once_with(url="https://api.github.com/rate_limit")
 
-def test_determine_urlopen_retry_true(mocker):
+    # The lock is not held while checking, so other threads are not blocked by the request
+    def get_json_response(url):
+        assert not report_size_deltas.rate_limit_lock.locked()
+        assert report_size_deltas.rate_limit_check_in_progress
+        return json_data
+
+    json_data["json_data"]["resources"]["core"]["remaining"] = 42
+    report_size_deltas.get_json_response = unittest.mock.MagicMock(side_effect=get_json_response)
+    report_size_deltas.rate_limit_check_time -= report_size_deltas.rate_limit_check_interval
+    report_size_deltas.handle_rate_limiting()
+    report_size_deltas.get_json_response.assert_called_once_with(url="https://api.github.com/rate_limit")
+    assert not report_size_deltas.rate_limit_check_in_progress
+
+    # Another thread is already checking, so the last known value is used
+    report_size_deltas.get_json_response.reset_mock()
+    report_size_deltas.rate_limit_check_in_progress = True
+    report_size_deltas.handle_rate_limiting()
+    report_size_deltas.get_json_response.assert_not_called()
+    assert report_size_deltas.rate_limit_remaining == 41
+
+    # Failed check doesn't leave the check marked as in progress
+    report_size_deltas.rate_limit_check_in_progress = False
+    report_size_deltas.get_json_response = unittest.mock.MagicMock(side_effect=urllib.error.URLError(reason="foo"))
+    with pytest.raises(expected_exception=urllib.error.URLError):
+        report_size_deltas.handle_rate_limiting()
+    assert not report_size_deltas.rate_limit_check_in_progress
+
+
+def test_record_rate_limit_remaining():
+    report_size_deltas = get_reportsizedeltas_object()
+
+    report_size_deltas.record_rate_limit_remaining(response_headers={"X-RateLimit-Remaining": "1000"})
+    assert report_size_deltas.rate_limit_remaining == 1000
+
+    # Recorded value makes the rate limit API check unnecessary
+    report_size_deltas.get_json_response = unittest.mock.MagicMock()
+    report_size_deltas.handle_rate_limiting()
+    report_size_deltas.get_json_response.assert_not_called()
+
+    # Response without rate limit data
+    report_size_deltas.record_rate_limit_remaining(response_headers={})
+    assert report_size_deltas.rate_limit_remaining == 999
+
+
+def test_length_limited_writer():
+    writer = reportsizedeltas.LengthLimitedWriter(maximum_length=11)
+
+    writer.write(text="foo")
+    assert writer.write_within_limit(chunks=["bar", "baz"])
+    assert writer.getvalue() == "foobarbaz"
+
+    # Content would reach the maximum length, so the chunks are rolled back
+    chunks = iter(["q", "ux", "quux"])
+    assert not writer.write_within_limit(chunks=chunks)
+    assert writer.getvalue() == "foobarbaz"
+    # Chunks after the limit was reached are not consumed
+    assert list(chunks) == ["quux"]
+
+    # Written regardless of the maximum length
+    writer.write(text="qux")
+    assert writer.getvalue() == "foobarbazqux"
+
+
+@pytest.mark.parametrize(
+    "code, msg",
+    [(500, "Internal Server Error"), (502, "Bad Gateway"), (503, "Service Unavailable"), (504, "Gateway Timeout")],
+)
+def test_determine_urlopen_retry_true(mocker, code, msg):
     mocker.patch("time.sleep", autospec=True)
 
-    assert reportsizedeltas.determine_urlopen_retry(
-        exception=urllib.error.HTTPError(None, 502, "Bad Gateway", None, None)
-    )
+    assert reportsizedeltas.determine_urlopen_retry(exception=urllib.error.HTTPError(None, code, msg, None, None))
+
+
+def test_determine_urlopen_retry_backoff(mocker):
+    sleep = mocker.patch("time.sleep", autospec=True)
+    mocker.patch("random.uniform", autospec=True, return_value=0)
+
+    exception = urllib.error.HTTPError(None, 502, "Bad Gateway", None, None)
+    for retry_count in range(3):
+        assert reportsizedeltas.determine_urlopen_retry(exception=exception, retry_count=retry_count)
+
+    # The delay doubles with each retry
+    sleep.assert_has_calls(calls=[unittest.mock.call(5), unittest.mock.call(10), unittest.mock.call(20)])
 
 
 def test_determine_urlopen_retry_false():
@@ -958,6 +1360,29 @@ def test_determine_urlopen_retry_false():
     )
 
 
+def test_get_urlopen_retry_delay(mocker):
+    mocker.patch("random.uniform", autospec=True, return_value=1.5)
+
+    exception = urllib.error.HTTPError(None, 502, "Bad Gateway", None, None)
+    # Delay grows exponentially, up to the maximum
+    assert [
+        reportsizedeltas.get_urlopen_retry_delay(exception=exception, retry_count=retry_count)
+        for retry_count in [0, 1, 2, 10]
+    ] == [6.5, 11.5, 21.5, 300]
+
+    # Exception without a response
+    exception = TimeoutError("timed out")
+    assert reportsizedeltas.get_urlopen_retry_delay(exception=exception, retry_count=0) == 6.5
+
+    # Delay specified by the server
+    exception = urllib.error.HTTPError(None, 403, "Forbidden", {"Retry-After": "42"}, None)
+    assert reportsizedeltas.get_urlopen_retry_delay(exception=exception, retry_count=0) == 42
+
+    # Delay specified by the server exceeds the maximum
+    exception = urllib.error.HTTPError(None, 403, "Forbidden", {"Retry-After": "3600"}, None)
+    assert reportsizedeltas.get_urlopen_retry_delay(exception=exception, retry_count=0) == 300
+
+
 def test_get_page_count():
     page_count = 4
     link_header = (
@@ -967,23 +1392,57 @@ def test_get_page_count():
 
     assert page_count == reportsizedeltas.get_page_count(link_header=link_header)
 
+    # Last page, so there is no "last" link
+    link_header = (
+        '<https://api.github.com/repositories/919161/pulls?page=3>; rel="prev", '
+        '<https://api.github.com/repositories/919161/pulls?page=1>; rel="first"'
+    )
+    assert 1 == reportsizedeltas.get_page_count(link_header=link_header)
+
+    # Query contains a comma after the page parameter
+    link_header = (
+        '<https://api.github.com/repositories/919161/pulls?page=2&labels=foo,bar>; rel="next", '
+        '<https://api.github.com/repositories/919161/pulls?page=7&labels=foo,bar>; rel="last"'
+    )
+    assert 7 == reportsizedeltas.get_page_count(link_header=link_header)
+
+    # Response is not paginated
+    assert 1 == reportsizedeltas.get_page_count(link_header=None)
+
 
 @pytest.mark.parametrize(
     "report, column_heading, expected_column_number, expected_report",
     [
         (
-            [["Board", "foo memory type", "%"], ["foo board", 12, 234]],
+            reportsizedeltas.Report(
+                headings=["Board", "foo memory type", "%"],
+                heading_index={"foo memory type": 1},
+                rows=[{0: "foo board", 1: 12, 2: 234}],
+            ),
             "foo memory type",
             1,
-            [["Board", "foo memory type", "%"], ["foo board", 12, 234]],
+            reportsizedeltas.Report(
+                headings=["Board", "foo memory type", "%"],
+                heading_index={"foo memory type": 1},
+                rows=[{0: "foo board", 1: 12, 2: 234}],
+            ),
         ),
         (
-            [["Board", "foo memory type", "%"], ["foo board", 12, 234, "bar board"]],
+            reportsizedeltas.Report(
+                headings=["Board", "foo memory type", "%"],
+                heading_index={"foo memory type": 1},
+                rows=[{0: "foo board", 1: 12, 2: 234}],
+            ),
             "bar memory type",
             3,
-            [["Board", "foo memory type", "%", "bar memory type", "%"], ["foo board", 12, 234, "bar board", "", ""]],
+            reportsizedeltas.Report(
+                headings=["Board", "foo memory type", "%", "bar memory type", "%"],
+                heading_index={"foo memory type": 1, "bar memory type": 3},
+                rows=[{0: "foo board", 1: 12, 2: 234}],
+            ),
         ),
     ],
+    ids=["existing-column", "new-column"],
 )
 def test_get_report_column_number(report, column_heading, expected_column_number, expected_report):
     assert (
@@ -993,6 +1452,29 @@ def test_get_report_column_number(report, column_heading, expected_column_number
     assert report == expected_report
 
 
+def test_create_report_data():
+    assert reportsizedeltas.create_report_data(first_column_heading="Board") == reportsizedeltas.Report(
+        headings=["Board"],
+        heading_index={},
+        rows=[],
+    )
+
+
+def test_get_report_row_list():
+    report_data = reportsizedeltas.Report(
+        headings=["Board", "foo memory type", "%", "bar memory type", "%"],
+        heading_index={"foo memory type": 1, "bar memory type": 3},
+        rows=[{0: "foo board", 1: 12, 2: 234}, {0: "bar board", 3: 42, 4: 11}],
+    )
+
+    # Cells of columns the row has no data for are empty
+    assert reportsizedeltas.get_report_row_list(report_data=report_data) == [
+        ["Board", "foo memory type", "%", "bar memory type", "%"],
+        ["foo board", 12, 234, "", ""],
+        ["bar board", "", "", 42, 11],
+    ]
+
+
 def test_generate_markdown_table():
     assert (
         reportsizedeltas.generate_markdown_table(row_list=[["Board", "Flash", "RAM"], ["foo:bar:baz", 42, 11]])
@@ -1000,7 +1482,29 @@ def test_generate_markdown_table():
     )
 
 
+def test_iter_markdown_table():
+    assert list(
+        reportsizedeltas.iter_markdown_table(row_list=[["Board", "Flash", "RAM"], ["foo:bar:baz", 42, 11]])
+    ) == [
+        "Board|Flash|RAM\n",
+        "-|-|-\n",
+        "foo:bar:baz|42|11\n",
+    ]
+
+
+def test_get_markdown_table_divider():
+    assert reportsizedeltas.get_markdown_table_divider(column_count=3) == "-|-|-"
+    assert reportsizedeltas.get_markdown_table_divider(column_count=1) == "-"
+
+
 def test_generate_csv_table():
     assert reportsizedeltas.generate_csv_table(row_list=[["Board", "Flash", "RAM"], ["foo:bar:baz", 42, 11]]) == (
         "Board,Flash,RAM\nfoo:bar:baz,42,11\n"
     )
+
+
+def test_iter_csv_rows():
+    assert list(reportsizedeltas.iter_csv_rows(row_list=[["Board", "Flash", "RAM"], ["`foo:bar:baz`", 42, 11]])) == [
+        "Board,Flash,RAM\n",
+        "foo:bar:baz,42,11\n",
+    ]